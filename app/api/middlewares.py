@@ -0,0 +1,51 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import HTTP_REQUEST_DURATION
+from app.profiler import query_profiler
+
+
+class HTTPMetricsMiddleware:
+    """
+    Измеряет длительность HTTP запросов по шаблону маршрута (например, /get_programs), а не по полному пути,
+    чтобы количество рядов метрики не зависело от параметров запроса. Потоковые ответы измеряются целиком.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Маршрут FastAPI записывает в scope при сопоставлении запроса
+            route = getattr(scope.get('route'), 'path', 'other')
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started,
+                                          method=scope['method'], route=route, status=status)
+
+
+class SQLProfilerMiddleware:
+    """Объединяет запросы к базе данных, выполненные при обработке HTTP запроса, для профилировщика SQL."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        with query_profiler.request(lambda: f"{scope['method']} {getattr(scope.get('route'), 'path', scope['path'])}"):
+            await self.app(scope, receive, send)
@@ -1,77 +1,180 @@
+import asyncio
 import json
-from typing import Annotated
+from decimal import Decimal, InvalidOperation
+from tempfile import SpooledTemporaryFile
+from typing import Annotated, AsyncIterator
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Form
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Form
 from fastapi.requests import Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from aiogram.types.input_file import FSInputFile
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from aiogram.types.input_file import BufferedInputFile
 from pydantic import ValidationError
 
-from app.api.schemas import ApplicationServiceData, ApplicationData
+from app.api.schemas import ApplicationServiceData, ApplicationData, BulkOfferData
 from app.bot.create_bot import bot
 from app.bot.keyboards.kbs import main_keyboard
+from app.bot.outbox import outbox_worker, outbox_message
 from app.config import settings
-from app.dao.dao import TrainingTypeDAO, TrainingProgramDAO, ApplicationDAO, UserDAO
-from app.commercial_offer.offer_docx import fill_out_docx_template
+from app.dao.dao import TrainingProgramDAO, ApplicationDAO, OutboxMessageDAO, UserDAO
+from app.dao.catalog_cache import catalog_cache
+from app.dao.loader import BatchLoader
+from app.dao.rows import ApplicationRow
+from app.dao.session import get_unit_of_work, after_commit, unit_of_work
+from app.commercial_offer.offer_docx import prepare_offer_data
+from app.commercial_offer.renderer import offer_renderer
+from app.commercial_offer.zip_stream import zip_stream
+from app.models import ApplicationStatus
 
 router = APIRouter(prefix='', tags=['Фронтенд'])
-templates = Jinja2Templates(directory='app/templates')
+TEMPLATES_DIRECTORY = 'app/templates'
+_templates = None
+_stream_templates = None
+
+
+def get_templates():
+    """Шаблоны страниц (Jinja2Templates). Jinja импортируется при первой отрисовке страницы, а не при запуске."""
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory=TEMPLATES_DIRECTORY)
+    return _templates
+
+
+def get_stream_templates():
+    """Окружение для потокового рендеринга: шаблон выдаётся по частям по мере перебора асинхронных данных."""
+    global _stream_templates
+    if _stream_templates is None:
+        from jinja2 import Environment, FileSystemLoader
+        _stream_templates = Environment(loader=FileSystemLoader(TEMPLATES_DIRECTORY), autoescape=True,
+                                        enable_async=True)
+    return _stream_templates
 
 
 @router.get("/", response_class=HTMLResponse)
 async def get_application_form(request: Request):
-    return templates.TemplateResponse("issue.html", {"request": request})
+    return get_templates().TemplateResponse("issue.html", {"request": request})
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверяет, совпадает ли ETag из заголовка If-None-Match с текущим."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+async def catalog_response(request: Request, get_body) -> Response:
+    """
+    Отдаёт заранее сериализованный ответ справочника с ETag и Cache-Control.
+    Если клиент прислал актуальный ETag, отвечает 304 без тела.
+    """
+    etag = await catalog_cache.get_etag()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.CATALOG_MAX_AGE}"}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=get_body(), media_type="application/json", headers=headers)
 
 
 @router.get("/get_training_types")
-async def get_training_types():
-    types = await TrainingTypeDAO.find_all()
-    return {"types": [{"id": t.id, "name": t.name} for t in types]}
+async def get_training_types(request: Request):
+    return await catalog_response(request, lambda: catalog_cache.types_body)
 
 
 @router.get("/get_programs")
-async def get_programs(type_id: int):
-    programs = await TrainingProgramDAO.find_all(training_type_id=type_id)
-    return {"programs": [{"id": p.id, "name": p.name} for p in programs]}
+async def get_programs(request: Request, type_id: int):
+    return await catalog_response(request, lambda: catalog_cache.programs_body(type_id))
+
 
+def next_page_url(request: Request, before_id: int | None) -> str | None:
+    """Ссылка на следующую страницу списка заявок с сохранением остальных параметров запроса."""
+    if before_id is None:
+        return None
+    return f"{request.url.path}?{urlencode({**request.query_params, 'before_id': before_id})}"
 
-@router.get("/applications", response_class=HTMLResponse)
-async def get_applications(request: Request, user_id: int = None):
+
+@router.get("/applications", response_class=HTMLResponse, dependencies=[Depends(get_unit_of_work)])
+async def get_applications(request: Request, user_id: int = None, before_id: int = None):
     data_page = {"request": request, "message": None}
     user_check = await UserDAO.find_one_or_none(telegram_id=user_id)
     if not user_id or not user_check:
         data_page['message'] = 'Пользователь по которому нужно отобразить заявки не указан или не найден в базе данных'
-    applications = await ApplicationDAO.get_applications(user_id, admin=False)
+    applications, next_before_id = await ApplicationDAO.get_applications_page(
+        user_id, admin=False, before_id=before_id, page_size=settings.APPLICATIONS_PAGE_SIZE)
     if not applications:
         data_page['message'] = ('У вас нет заявок! Подайте заявку по кнопке "Оформить заявку" '
                                 'или нажав на кнопку приложения "Заявки"')
-    data_page['active_applications'] = tuple(filter(lambda x: x['status'] == 'В работе', applications))
-    data_page['completed_applications'] = tuple(filter(lambda x: x['status'] != 'В работе', applications))
-    return templates.TemplateResponse("applications.html", data_page)
+    data_page['active_applications'] = tuple(filter(lambda x: x['status'] == ApplicationStatus.IN_WORK, applications))
+    data_page['completed_applications'] = tuple(filter(lambda x: x['status'] != ApplicationStatus.IN_WORK, applications))
+    data_page['next_url'] = next_page_url(request, next_before_id)
+    return get_templates().TemplateResponse("applications.html", data_page)
+
+
+async def stream_template(name: str, context: dict, chunk_size: int = 16384) -> AsyncIterator[bytes]:
+    """Рендерит шаблон асинхронно и выдаёт результат частями примерно по chunk_size символов."""
+    buffer, size = [], 0
+    async for part in get_stream_templates().get_template(name).generate_async(context):
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
 
 
-@router.get("/admin_applications", response_class=HTMLResponse)
-async def get_applications(request: Request, user_id: int, work: bool):
+async def archive_stream_response(request: Request, user_id: int) -> Response:
+    """
+    Отдаёт весь архив заявок одной страницей, не загружая его в память: заявки читаются из базы данных
+    порциями и сразу рендерятся в ответ (chunked transfer encoding).
+    """
+    applications = ApplicationDAO.stream_applications(user_id, admin=True, in_work=False,
+                                                      batch_size=settings.ARCHIVE_STREAM_BATCH)
+    # Первую заявку читаем заранее, чтобы для пустого архива показать сообщение
+    first = await anext(applications, None)
+    if first is None:
+        await applications.aclose()
+        return get_templates().TemplateResponse("admin_applications.html", {
+            "request": request, "message": 'Заявок в архиве нет!', "active_applications": None,
+            "completed_applications": None, "next_url": None,
+        })
+
+    async def completed_applications() -> AsyncIterator[ApplicationRow]:
+        try:
+            yield first
+            async for application in applications:
+                yield application
+        finally:
+            await applications.aclose()
+
+    context = {"request": request, "message": None, "active_applications": None,
+               "completed_applications": completed_applications(), "next_url": None}
+    return StreamingResponse(stream_template("admin_applications.html", context), media_type="text/html")
+
+
+@router.get("/admin_applications", response_class=HTMLResponse, dependencies=[Depends(get_unit_of_work)])
+async def get_applications(request: Request, user_id: int, work: bool, before_id: int = None):
+    if not work and settings.ARCHIVE_STREAM:
+        return await archive_stream_response(request, user_id)
     data_page = {"request": request, "message": None, "active_applications": None, "completed_applications": None}
+    applications, next_before_id = await ApplicationDAO.get_applications_page(
+        user_id, admin=True, in_work=work, before_id=before_id, page_size=settings.APPLICATIONS_PAGE_SIZE)
     if work:
-        applications = await ApplicationDAO.get_applications(user_id, admin=True)
-        active_applications = tuple(filter(lambda x: x['status'] == 'В работе', applications))
-        data_page['message'] = 'Все заявки отработаны!' if not active_applications else None
-        data_page['active_applications'] = active_applications if active_applications else None
+        data_page['message'] = 'Все заявки отработаны!' if not applications else None
+        data_page['active_applications'] = applications if applications else None
     else:
-        applications = await ApplicationDAO.get_applications(user_id, admin=True)
-        completed_applications = tuple(filter(lambda x: x['status'] != 'В работе', applications))
-        data_page['message'] = 'Заявок в архиве нет!' if not completed_applications else None
-        data_page['completed_applications'] = completed_applications if completed_applications else None
-    return templates.TemplateResponse("admin_applications.html", data_page)
+        data_page['message'] = 'Заявок в архиве нет!' if not applications else None
+        data_page['completed_applications'] = applications if applications else None
+    data_page['next_url'] = next_page_url(request, next_before_id)
+    return get_templates().TemplateResponse("admin_applications.html", data_page)
 
 
-@router.post("/submit_application", response_class=JSONResponse)
+@router.post("/submit_application", response_class=JSONResponse, dependencies=[Depends(get_unit_of_work)])
 async def get_programs(request: Request):
     data = await request.json()
     # Установим статус
-    data['status'] = 'В работе'
+    data['status'] = ApplicationStatus.IN_WORK
     services_list = data.pop('services')
     # Проведем валидацию и конвертацию значений, составим модели
     try:
@@ -84,41 +187,48 @@ async def get_programs(request: Request):
         ])
         return JSONResponse(content={"status": "error", "message": msg}, status_code=400)
     application_data_val = application_data.dict()
-    model, model_id = await ApplicationDAO.add_model(**application_data_val)
-    # Сформируем и отправим сообщения пользователю и администратору
+    # Сформируем сообщения пользователю и администратору
     user_info = await UserDAO.find_one_or_none(telegram_id=application_data.user_id)
-    program_name = [await TrainingProgramDAO.find_one_or_none_by_id(i.training_program_id) for i in
-                    services_models_list]
+    # Программы услуг загружаются одним запросом, повторяющиеся программы - один раз
+    programs = BatchLoader(TrainingProgramDAO)
+    program_name = await asyncio.gather(*(programs.load(i.training_program_id) for i in services_models_list))
+    if None in program_name:
+        return JSONResponse(content={"status": "error", "message": "Программа обучения не найдена"}, status_code=400)
     program_info = [{'Программа': i.name, 'Разряд': j.training_rank, 'Количество': j.people_count} for i, j in
                     zip(program_name, services_models_list)]
     program_str = '\n'.join([(f"    ➤ {j['Программа']}{' ' + j['Разряд'] + ' разряда' if j['Разряд'] else ''}"
                               f" в количестве {j['Количество']} человек") for j in program_info])
-    message = (
-        f"🎉 <b>{user_info.first_name}, ваша заявка успешно принята!</b>\n\n"
-        f"📬 <b>Регистрационный номер заявки:</b> {model_id}\n"
-        "💬 <b>Информация о коммерческом предложении:</b>\n"
-        f"🏢 <b>Компания:</b> {application_data.company_name}\n"
-        f"🎓 <b>Обучение:</b>\n"
-        f"{program_str}\n\n"
-        "Спасибо за выбор нашего учебного центра! ✨"
-    )
-    # Сообщение администратору
-    admin_message = (
-        "🔔 <b>Новая запись!</b>\n\n"
-        "📄 <b>Детали заявки:</b>\n"
-        f"📬 <b>Регистрационный номер заявки:</b> {model_id}\n"
-        f"🏢 <b>Компания:</b> {application_data.company_name}\n"
-        f"👤 Имя клиента: {user_info.first_name}\n"
-        f"💬 Телеграм клиента: @{user_info.username}\n"
-        f"📞 Телефон клиента: {application_data.phone_number}\n"
-        f"📧 Почта клиента: {application_data.email}\n"
-        f"🎓 <b>Обучение:</b>\n"
-        f"{program_str}\n"
-    )
     kb = main_keyboard(user_id=application_data.user_id, first_name=user_info.first_name)
-    # Отправка сообщений ботом
-    await bot.send_message(chat_id=application_data.user_id, text=message, reply_markup=kb)
-    await bot.send_message(chat_id=settings.ADMIN_ID, text=admin_message, reply_markup=kb)
+
+    def notifications(model_id: int) -> list[dict]:
+        message = (
+            f"🎉 <b>{user_info.first_name}, ваша заявка успешно принята!</b>\n\n"
+            f"📬 <b>Регистрационный номер заявки:</b> {model_id}\n"
+            "💬 <b>Информация о коммерческом предложении:</b>\n"
+            f"🏢 <b>Компания:</b> {application_data.company_name}\n"
+            f"🎓 <b>Обучение:</b>\n"
+            f"{program_str}\n\n"
+            "Спасибо за выбор нашего учебного центра! ✨"
+        )
+        # Сообщение администратору
+        admin_message = (
+            "🔔 <b>Новая запись!</b>\n\n"
+            "📄 <b>Детали заявки:</b>\n"
+            f"📬 <b>Регистрационный номер заявки:</b> {model_id}\n"
+            f"🏢 <b>Компания:</b> {application_data.company_name}\n"
+            f"👤 Имя клиента: {user_info.first_name}\n"
+            f"💬 Телеграм клиента: @{user_info.username}\n"
+            f"📞 Телефон клиента: {application_data.phone_number}\n"
+            f"📧 Почта клиента: {application_data.email}\n"
+            f"🎓 <b>Обучение:</b>\n"
+            f"{program_str}\n"
+        )
+        return [outbox_message(chat_id=application_data.user_id, text=message, reply_markup=kb),
+                outbox_message(chat_id=settings.ADMIN_ID, text=admin_message, reply_markup=kb)]
+
+    # Заявка и сообщения записываются в одной транзакции, отправку выполнит outbox_worker
+    await ApplicationDAO.add_model(**application_data_val, outbox=notifications)
+    after_commit(outbox_worker.wake)
     return JSONResponse(content={"status": "success", "message": "Заявка успешно отправлена"})
 
 
@@ -126,24 +236,127 @@ async def get_programs(request: Request):
 async def enter_prices(request: Request, application_data: Annotated[str, Form()]):
     application = json.loads(application_data)
     # Рендерим шаблон страницы с передачей данных о заявке
-    return templates.TemplateResponse("enter_prices.html", {"request": request, "application": application})
+    return get_templates().TemplateResponse("enter_prices.html", {"request": request, "application": application})
+
+
+def offer_message(application_id: int, total_sum) -> str:
+    """Сообщение клиенту о подготовленном коммерческом предложении."""
+    return (
+        f"🎉 <b>По вашей заявки под номером №{application_id}, подготовлено предложение!</b>\n\n"
+        f"💰 <b>Сумма контракта составит:</b> {total_sum}\n"
+        "В ближайшее время Вы получите подписанное коммерческое предложение, на указанную почту."
+        "Спасибо за выбор нашего учебного центра! ✨"
+    )
 
 
 @router.post("/application_work", response_class=JSONResponse)
 async def get_programs(request: Request):
     data = await request.json()
     # Составим файл коммерческого предложения
-    docx_offer = fill_out_docx_template(data)
-    document = FSInputFile(docx_offer)
+    data = prepare_offer_data(data)
     total_sum = data.get("all_total")
-    message = (
-        f"🎉 <b>По вашей заявки под номером №{data['id']}, подготовлено предложение!</b>\n\n"
-        f"💰 <b>Сумма контракта составит:</b> {total_sum}\n"
-        "В ближайшее время Вы получите подписанное коммерческое предложение, на указанную почту."
-        "Спасибо за выбор нашего учебного центра! ✨"
-    )
-    await bot.send_message(chat_id=data['user_id'], text=message)
+    # Сумму проверяем до рендеринга, чтобы некорректный запрос не занимал процесс рендеринга
+    try:
+        offer_total = Decimal(str(total_sum)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return JSONResponse(content={"success": False, "message": "Некорректная сумма предложения"},
+                            status_code=400)
+    try:
+        docx_offer = await offer_renderer.render(data)
+    except asyncio.TimeoutError:
+        return JSONResponse(content={"success": False, "message": "Не удалось подготовить предложение"},
+                            status_code=504)
+    # Документ администратору отправляется до записи: если отправка не удалась, ничего не изменено
+    # и запрос можно повторить. Клиент получит сообщение, только если статус заявки сохранён
+    document = BufferedInputFile(docx_offer, filename=f"offer_{data['id']}.docx")
     await bot.send_document(chat_id=settings.ADMIN_ID, document=document)
-    # Обновим статус в БД
-    await ApplicationDAO.update({'id': data['id']}, status=f'Предложение {total_sum}')
+    async with unit_of_work():
+        await ApplicationDAO.update({'id': data['id']}, status=ApplicationStatus.OFFER, offer_total=offer_total)
+        await OutboxMessageDAO.add(**outbox_message(chat_id=data['user_id'],
+                                                    text=offer_message(data['id'], total_sum)))
+        after_commit(outbox_worker.wake)
     return JSONResponse(content={"success": True})
+
+
+async def build_offers_archive(offers: list[dict]) -> SpooledTemporaryFile:
+    """
+    Рендерит все коммерческие предложения и собирает из них ZIP архив. Архив хранится в памяти,
+    пока не превысит BULK_OFFERS_SPOOL_SIZE байт, дальше - во временном файле.
+    """
+    archive = SpooledTemporaryFile(max_size=settings.BULK_OFFERS_SPOOL_SIZE)
+    try:
+        documents = ((f"offer_{data['id']}.docx", document)
+                     async for data, document in offer_renderer.render_many(offers))
+        async for chunk in zip_stream(documents):
+            await asyncio.to_thread(archive.write, chunk)
+    except BaseException:
+        archive.close()
+        raise
+    return archive
+
+
+async def file_stream(file: SpooledTemporaryFile, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    """Отдаёт файл с начала частями по chunk_size байт и закрывает его."""
+    try:
+        file.seek(0)
+        while chunk := await asyncio.to_thread(file.read, chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+@router.post("/bulk_offers")
+async def bulk_offers(request: Request):
+    """
+    Массовая подготовка коммерческих предложений. Принимает {"offers": [{"id": 1, "prices": [...]}, ...]},
+    где prices - цены за одного человека в порядке услуг заявки, и возвращает ZIP архив с документами.
+    Статусы заявок меняются, только если подготовлены все документы.
+    """
+    try:
+        bulk_data = BulkOfferData(**await request.json())
+    except ValidationError as e:
+        msg = '\n'.join([f'Ошибка в поле {error['loc'][0]} - {error["msg"]}' for error in e.errors()])
+        return JSONResponse(content={"success": False, "message": msg}, status_code=400)
+    prices = {item.id: item.prices for item in bulk_data.offers}
+    applications = await ApplicationDAO.get_applications_by_ids(list(prices))
+    missing = set(prices) - {application['id'] for application in applications}
+    if missing:
+        return JSONResponse(content={"success": False,
+                                     "message": f"Заявки не найдены: {', '.join(map(str, sorted(missing)))}"},
+                            status_code=400)
+    offers = []
+    for application in applications:
+        services, application_prices = application['services'], prices[application['id']]
+        if len(services) != len(application_prices):
+            return JSONResponse(content={"success": False,
+                                         "message": f"Для заявки №{application['id']} количество цен "
+                                                    f"не совпадает с количеством услуг ({len(services)})"},
+                                status_code=400)
+        for service, price in zip(services, application_prices):
+            service['price'] = price
+        offers.append(prepare_offer_data(application))
+    try:
+        offer_totals = {data['id']: Decimal(str(data['all_total'])).quantize(Decimal('0.01')) for data in offers}
+    except InvalidOperation:
+        return JSONResponse(content={"success": False, "message": "Некорректная сумма предложения"},
+                            status_code=400)
+    # Статусы и уведомления записываются, только когда все документы готовы: если рендеринг прервётся,
+    # заявки останутся в работе и клиенты не получат сообщений о предложениях, которых нет в архиве
+    try:
+        archive = await build_offers_archive(offers)
+    except asyncio.TimeoutError:
+        return JSONResponse(content={"success": False, "message": "Не удалось подготовить предложения"},
+                            status_code=504)
+    try:
+        async with unit_of_work():
+            await ApplicationDAO.set_offers(offer_totals)
+            await OutboxMessageDAO.add_many([
+                outbox_message(chat_id=data['user_id'], text=offer_message(data['id'], data['all_total']))
+                for data in offers
+            ])
+            after_commit(outbox_worker.wake)
+    except BaseException:
+        archive.close()
+        raise
+    headers = {"Content-Disposition": 'attachment; filename="offers.zip"', "Content-Length": str(archive.tell())}
+    return StreamingResponse(file_stream(archive), media_type="application/zip", headers=headers)
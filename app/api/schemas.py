@@ -2,6 +2,8 @@ import re
 
 from pydantic import BaseModel, Field, EmailStr, field_validator, ValidationError
 
+from app.models import ApplicationStatus
+
 
 class ApplicationServiceData(BaseModel):
     training_type_id: int = Field(..., alias='training_type_id')
@@ -25,7 +27,7 @@ class ApplicationData(BaseModel):
     phone_number: str = Field(..., alias='phone_number', description="Номер телефона")
     email: EmailStr = Field(..., alias='email', description="Почта")
     services: list[ApplicationServiceData] = Field(..., description="Список заявок")
-    status: str = Field(..., alias='status', description="Статус заявки")
+    status: ApplicationStatus = Field(..., alias='status', description="Статус заявки")
 
     @field_validator('user_id', mode='before')
     def convert_to_int(cls, v):
@@ -42,3 +44,12 @@ class ApplicationData(BaseModel):
         if not pattern.match(v):
             raise ValidationError('Некорректный номер телефона. Ожидается формат +7XXXXXXXXXX или 8XXXXXXXXXX.')
         return v
+
+
+class BulkOfferItem(BaseModel):
+    id: int = Field(..., alias='id', description="ID заявки")
+    prices: list[float] = Field(..., alias='prices', description="Цены услуг заявки за одного человека")
+
+
+class BulkOfferData(BaseModel):
+    offers: list[BulkOfferItem] = Field(..., min_length=1, description="Заявки и цены их услуг")
@@ -1,20 +1,58 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 
+from app.bot.middlewares import HandlerMetricsMiddleware, SQLProfilerMiddleware
+from app.bot.outbound import outbound_limiter, telegram_metrics
+from app.bot.outbox import outbox_message, outbox_worker
 from app.config import settings
+from app.dao.dao import OutboxMessageDAO
+from app.profiler import query_profiler
 
-bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)) if settings.TELEGRAM_API_URL else None
+bot = Bot(token=settings.BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+bot.session.middleware(outbound_limiter)
+# Метрики подключены после ограничителя и измеряют сам запрос, без ожидания в очереди
+bot.session.middleware(telegram_metrics)
 dp = Dispatcher()
+for event_name, observer in dp.observers.items():
+    if event_name not in ('update', 'error'):
+        observer.middleware(HandlerMetricsMiddleware(event_name))
+        if query_profiler.enabled:
+            observer.middleware(SQLProfilerMiddleware(event_name))
 
 
 async def start_bot():
+    # Сообщение доставит outbox_worker, запуск приложения не ждёт ответа Telegram
     try:
-        await bot.send_message(settings.ADMIN_ID, f'Я запущен 🥳')
+        await OutboxMessageDAO.add(**outbox_message(settings.ADMIN_ID, 'Я запущен 🥳'))
+        outbox_worker.wake()
     except:
         pass
 
 
+async def setup_webhook(allowed_updates: list[str]) -> bool:
+    """
+    Устанавливает вебхук, если в Telegram зарегистрирован другой адрес или другой набор типов обновлений
+    (или включён WEBHOOK_FORCE_SET). Повторная установка при каждом перезапуске не нужна, а обновления,
+    накопившиеся за время перезапуска, сохраняются, если не включён WEBHOOK_DROP_PENDING.
+
+    Возвращает True, если вебхук был установлен.
+    """
+    webhook_url = settings.get_webhook_url()
+    if not settings.WEBHOOK_FORCE_SET:
+        info = await bot.get_webhook_info()
+        if info.url == webhook_url and set(info.allowed_updates or ()) == set(allowed_updates):
+            return False
+    await bot.set_webhook(url=webhook_url,
+                          allowed_updates=allowed_updates,
+                          drop_pending_updates=settings.WEBHOOK_DROP_PENDING,
+                          secret_token=settings.WEBHOOK_SECRET)
+    return True
+
+
 async def stop_bot():
     try:
         await bot.send_message(settings.ADMIN_ID, 'Бот остановлен 😔')
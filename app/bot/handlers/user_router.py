@@ -3,6 +3,7 @@ from aiogram.filters import CommandStart
 from aiogram.types import Message
 
 from app.dao.dao import UserDAO
+from app.dao.session import unit_of_work
 from app.bot.keyboards.kbs import app_keyboard, greet_user, get_about_us_text
 
 user_router = Router()
@@ -11,14 +12,15 @@ user_router = Router()
 @user_router.message(CommandStart())
 async def cmd_start(message: Message) -> None:
     """Обрабатывает команду /start."""
-    user = await UserDAO.find_one_or_none(telegram_id=message.from_user.id)
-    if not user:
-        await UserDAO.add(
+    # Пользователь сохраняется до приветствия: транзакция не ждёт ответа Telegram, а кнопки приветствия
+    # открывают страницы, которые уже находят пользователя в базе данных
+    async with unit_of_work():
+        is_new_user = await UserDAO.register(
             telegram_id=message.from_user.id,
             first_name=message.from_user.first_name,
             username=message.from_user.username
         )
-    await greet_user(message, is_new_user=not user)
+    await greet_user(message, is_new_user=is_new_user)
 
 
 @user_router.message(F.text == '🔙 Назад')
@@ -0,0 +1,50 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.metrics import HANDLER_DURATION, HANDLER_ERRORS
+from app.profiler import query_profiler
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Измеряет длительность обработчиков события event_name и считает исключения в них."""
+
+    def __init__(self, event_name: str):
+        self.event_name = event_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get('handler')
+        handler_name = handler_object.callback.__name__ if handler_object else 'unknown'
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(event=self.event_name, handler=handler_name)
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, event=self.event_name, handler=handler_name)
+
+
+class SQLProfilerMiddleware(BaseMiddleware):
+    """Объединяет запросы к базе данных, выполненные обработчиком события event_name, для профилировщика SQL."""
+
+    def __init__(self, event_name: str):
+        self.event_name = event_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get('handler')
+        handler_name = handler_object.callback.__name__ if handler_object else 'unknown'
+        with query_profiler.request(f'{self.event_name} {handler_name}'):
+            return await handler(event, data)
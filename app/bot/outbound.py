@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import (TelegramRetryAfter, TelegramBadRequest, TelegramUnauthorizedError,
+                                TelegramForbiddenError, TelegramNotFound, TelegramConflictError,
+                                TelegramEntityTooLarge, TelegramServerError, TelegramNetworkError)
+from aiogram.methods import Response, TelegramMethod, GetUpdates
+from aiogram.methods.base import TelegramType
+
+from app.config import settings
+from app.metrics import registry, TELEGRAM_REQUEST_DURATION, TELEGRAM_REQUESTS
+
+# Код ответа Bot API, которому соответствует исключение aiogram
+_ERROR_CODES = (
+    (TelegramBadRequest, '400'),
+    (TelegramUnauthorizedError, '401'),
+    (TelegramForbiddenError, '403'),
+    (TelegramNotFound, '404'),
+    (TelegramConflictError, '409'),
+    (TelegramEntityTooLarge, '413'),
+    (TelegramRetryAfter, '429'),
+    (TelegramServerError, '500'),
+    (TelegramNetworkError, 'network'),
+)
+
+
+class TokenBucket:
+    """Ограничитель частоты: не более rate запросов в секунду с допустимым всплеском capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def block(self, seconds: float) -> None:
+        """Запрещает выдачу токенов на указанное время (например, после ответа 429 от Telegram)."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        """True, если бакет полон и никого не ограничивает."""
+        tokens = self._tokens + (time.monotonic() - self._updated) * self.rate
+        return not self._lock.locked() and tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """
+    Центральный диспетчер исходящих запросов к Telegram Bot API.
+
+    Подключается к сессии бота, поэтому через него проходят все вызовы: bot.send_message, bot.send_document,
+    message.answer и т.д. Запросы, адресованные чату, ограничиваются общим и per-chat token bucket,
+    одновременно выполняется не более concurrency запросов, а ответ 429 (TelegramRetryAfter) приводит
+    к паузе всех исходящих запросов и повторной отправке вместо исключения в обработчике.
+    """
+
+    def __init__(self, rate: float, chat_rate: float, chat_burst: int, concurrency: int, max_retries: int):
+        self.global_bucket = TokenBucket(rate, rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.sent = 0
+        self.retries = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= 10000:
+                # Забываем чаты, которым сейчас ничего не отправляется
+                self._chat_buckets = {key: value for key, value in self._chat_buckets.items() if not value.idle}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        started = time.monotonic()
+        chat_bucket = self._chat_bucket(chat_id)
+        try:
+            for attempt in range(self.max_retries + 1):
+                self.waiting += 1
+                try:
+                    await chat_bucket.acquire()
+                    await self.global_bucket.acquire()
+                    await self._semaphore.acquire()
+                finally:
+                    self.waiting -= 1
+                self.in_flight += 1
+                try:
+                    response = await make_request(bot, method)
+                except TelegramRetryAfter as e:
+                    if attempt == self.max_retries:
+                        raise
+                    logging.warning(f'Telegram ограничил отправку в чат {chat_id}, повтор через {e.retry_after} с')
+                    self.retries += 1
+                    # 429 - это и сигнал общего flood control, поэтому пауза нужна для всех чатов, а не только этого
+                    chat_bucket.block(e.retry_after)
+                    self.global_bucket.block(e.retry_after)
+                    continue
+                finally:
+                    self.in_flight -= 1
+                    self._semaphore.release()
+                self.sent += 1
+                return response
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            latency = time.monotonic() - started
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def stats(self) -> dict:
+        requests = self.sent + self.errors
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "retries": self.retries,
+            "errors": self.errors,
+            "latency_avg": self.latency_total / requests if requests else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Измеряет длительность запросов к Bot API и считает запросы по коду результата.
+
+    Длительность getUpdates не измеряется: при long polling запрос ждёт обновлений до POLLING_TIMEOUT
+    секунд, и это ожидание исказило бы распределение задержек Telegram.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        method_name = type(method).__name__
+        started = time.perf_counter()
+        code = 'error'
+        try:
+            response = await make_request(bot, method)
+            code = '200'
+            return response
+        except Exception as e:
+            code = next((code for exc_type, code in _ERROR_CODES if isinstance(e, exc_type)), 'error')
+            raise
+        finally:
+            if not isinstance(method, GetUpdates):
+                TELEGRAM_REQUEST_DURATION.observe(time.perf_counter() - started, method=method_name)
+            TELEGRAM_REQUESTS.inc(method=method_name, code=code)
+
+
+outbound_limiter = OutboundLimiter(rate=settings.OUTBOUND_RATE,
+                                   chat_rate=settings.OUTBOUND_CHAT_RATE,
+                                   chat_burst=settings.OUTBOUND_CHAT_BURST,
+                                   concurrency=settings.OUTBOUND_CONCURRENCY,
+                                   max_retries=settings.OUTBOUND_MAX_RETRIES)
+telegram_metrics = TelegramMetricsMiddleware()
+
+registry.gauge_callback(
+    'telegram_outbound_requests', 'Исходящие запросы к Telegram: ожидают ограничителя и выполняются',
+    ('state',), lambda: {('waiting',): outbound_limiter.waiting, ('in_flight',): outbound_limiter.in_flight})
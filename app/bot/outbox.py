@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+
+from aiogram import Bot
+from aiogram.types import ReplyKeyboardMarkup, InlineKeyboardMarkup
+
+from app.config import settings
+from app.dao.dao import OutboxMessageDAO
+from app.models import OutboxMessage, utcnow
+
+
+def outbox_message(chat_id: int, text: str,
+                   reply_markup: ReplyKeyboardMarkup | InlineKeyboardMarkup | None = None) -> dict:
+    """Формирует значения OutboxMessage для сообщения, которое нужно отправить после фиксации транзакции."""
+    return {
+        "chat_id": chat_id,
+        "text": text,
+        "reply_markup": reply_markup.model_dump_json(exclude_none=True) if reply_markup else None,
+    }
+
+
+class OutboxWorker:
+    """
+    Фоновая доставка сообщений из таблицы outbox_messages.
+
+    Воркер периодически (или сразу после wake()) выбирает недоставленные сообщения, отправляет их
+    и отмечает доставленными. При ошибке следующая попытка откладывается с экспоненциальной задержкой.
+    """
+
+    def __init__(self, poll_interval: float, batch_size: int, max_attempts: int,
+                 retry_base: float, retry_max: float):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def wake(self) -> None:
+        """Запускает доставку, не дожидаясь окончания интервала опроса."""
+        self._wakeup.set()
+
+    async def _send(self, bot: Bot, message: OutboxMessage) -> bool:
+        reply_markup = json.loads(message.reply_markup) if message.reply_markup else None
+        try:
+            await bot.send_message(chat_id=message.chat_id, text=message.text, reply_markup=reply_markup)
+        except Exception as e:
+            attempts = message.attempts + 1
+            delay = min(self.retry_base * 2 ** message.attempts, self.retry_max)
+            logging.warning(f'Не удалось доставить сообщение {message.id} (попытка {attempts}): {e}')
+            await OutboxMessageDAO.update({'id': message.id}, attempts=attempts, last_error=str(e),
+                                          next_attempt_at=utcnow() + timedelta(seconds=delay))
+            return False
+        return True
+
+    async def deliver_due(self, bot: Bot) -> int:
+        """Отправляет одну порцию сообщений, возвращает количество доставленных."""
+        messages = await OutboxMessageDAO.get_due(limit=self.batch_size, max_attempts=self.max_attempts)
+        if not messages:
+            return 0
+        results = await asyncio.gather(*(self._send(bot, message) for message in messages))
+        delivered = [message.id for message, ok in zip(messages, results) if ok]
+        if delivered:
+            await OutboxMessageDAO.mark_delivered(delivered)
+        return len(delivered)
+
+    async def _run(self, bot: Bot) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                # Полная порция означает, что в очереди могут оставаться сообщения
+                while await self.deliver_due(bot) == self.batch_size:
+                    pass
+            except Exception:
+                logging.exception('Ошибка при доставке сообщений из outbox')
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot: Bot) -> None:
+        self._task = asyncio.create_task(self._run(bot))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+outbox_worker = OutboxWorker(poll_interval=settings.OUTBOX_POLL_INTERVAL,
+                             batch_size=settings.OUTBOX_BATCH_SIZE,
+                             max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+                             retry_base=settings.OUTBOX_RETRY_BASE,
+                             retry_max=settings.OUTBOX_RETRY_MAX)
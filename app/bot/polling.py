@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+
+from app.bot.update_queue import UpdateQueue, update_queue
+from app.config import settings
+from app.metrics import registry
+
+# Предельная пауза (в секундах) между повторами getUpdates после ошибок подряд
+BACKOFF_MAX = 30
+
+
+class UpdatePoller:
+    """
+    Получение обновлений через long polling (getUpdates) вместо вебхука, когда BASE_SITE недоступен
+    из интернета (сервер за NAT, инцидент с доменом или сертификатом).
+
+    Обновления запрашиваются порциями до limit штук и ставятся в ту же очередь UpdateQueue, что и при
+    работе через вебхук: обработку выполняют UPDATE_WORKERS параллельных воркеров с тем же dp и роутерами,
+    обновления одного чата обрабатываются по порядку. Telegram считает обновление полученным, когда
+    следующий запрос getUpdates передаёт offset больше его update_id, поэтому offset сдвигается только
+    после постановки обновления в очередь, а пока очередь заполнена, новые обновления не запрашиваются.
+    """
+
+    def __init__(self, queue: UpdateQueue, timeout: int, limit: int):
+        self.queue = queue
+        self.timeout = timeout
+        self.limit = limit
+        self.offset: int | None = None
+        self.received = 0
+        self._bot: Bot | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _poll(self, allowed_updates: list[str]) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                updates = await self._bot.get_updates(offset=self.offset, limit=self.limit, timeout=self.timeout,
+                                                      allowed_updates=allowed_updates,
+                                                      request_timeout=self.timeout + 10)
+            except Exception as e:
+                # TelegramConflictError здесь означает, что обновления забирает другой процесс или установлен вебхук
+                logging.error(f'Ошибка при получении обновлений: {e!r}, повтор через {backoff:.0f} с')
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, BACKOFF_MAX)
+                continue
+            backoff = 1.0
+            for update in updates:
+                while not await self.queue.put(update):
+                    logging.warning('Очередь обновлений переполнена, жду освобождения')
+                self.offset = update.update_id + 1
+                self.received += 1
+
+    def start(self, bot: Bot, allowed_updates: list[str]) -> None:
+        """Запускает получение обновлений. Вебхук должен быть удалён, иначе Telegram отклонит getUpdates."""
+        self._bot = bot
+        self._task = asyncio.create_task(self._poll(allowed_updates))
+
+    async def stop(self) -> None:
+        """
+        Прекращает запрашивать обновления и подтверждает Telegram уже полученные, чтобы после перезапуска
+        они не пришли повторно. Обработку обновлений из очереди дожидается UpdateQueue.stop().
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self.offset is not None:
+            try:
+                await self._bot.get_updates(offset=self.offset, limit=1, timeout=0)
+            except Exception as e:
+                logging.warning(f'Не удалось подтвердить полученные обновления: {e!r}')
+
+
+update_poller = UpdatePoller(queue=update_queue, timeout=settings.POLLING_TIMEOUT, limit=settings.POLLING_LIMIT)
+
+registry.counter_callback('polling_updates_received_total', 'Обновления Telegram, полученные через getUpdates', (),
+                          lambda: {(): update_poller.received})
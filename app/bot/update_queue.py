@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from app.config import settings
+from app.metrics import registry
+
+
+def get_chat_key(update: Update) -> int:
+    """
+    Возвращает ключ чата, к которому относится обновление.
+    Обновления с одинаковым ключом обрабатываются строго по очереди.
+    """
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+    chat = getattr(event, 'chat', None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, 'from_user', None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь входящих обновлений с пулом обработчиков.
+
+    Вебхук только ставит обновление в очередь и сразу отвечает Telegram, а обработку выполняют воркеры.
+    Каждый чат закреплён за одним воркером, поэтому обновления одного чата обрабатываются в порядке
+    поступления, а разные чаты обрабатываются параллельно.
+    """
+
+    def __init__(self, workers: int, maxsize: int, put_timeout: float, dedup_size: int):
+        self.workers = workers
+        self.put_timeout = put_timeout
+        self._queues = [asyncio.Queue(maxsize=max(1, maxsize // workers)) for _ in range(workers)]
+        self._tasks: list[asyncio.Task] = []
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._dedup_size = dedup_size
+
+    def is_duplicate(self, update_id: int) -> bool:
+        """Проверяет, получали ли мы уже это обновление, и запоминает его идентификатор."""
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = None
+        if len(self._seen) > self._dedup_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def forget(self, update_id: int) -> None:
+        """Удаляет идентификатор из памяти, чтобы повторная доставка этого обновления была обработана."""
+        self._seen.pop(update_id, None)
+
+    async def put(self, update: Update) -> bool:
+        """
+        Ставит обновление в очередь его чата.
+
+        Возвращает:
+            False, если очередь не освободилась за put_timeout секунд.
+        """
+        queue = self._queues[get_chat_key(update) % self.workers]
+        try:
+            await asyncio.wait_for(queue.put(update), self.put_timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def qsize(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _worker(self, queue: asyncio.Queue, bot: Bot, dp: Dispatcher) -> None:
+        while True:
+            update = await queue.get()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                logging.exception(f'Ошибка при обработке обновления {update.update_id}')
+            finally:
+                queue.task_done()
+
+    def start(self, bot: Bot, dp: Dispatcher) -> None:
+        """Запускает воркеры обработки обновлений."""
+        self._tasks = [asyncio.create_task(self._worker(queue, bot, dp)) for queue in self._queues]
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Дожидается обработки оставшихся обновлений (не дольше timeout секунд) и останавливает воркеры."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f'Не дождались обработки {self.qsize()} обновлений из очереди')
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+update_queue = UpdateQueue(workers=settings.UPDATE_WORKERS,
+                           maxsize=settings.UPDATE_QUEUE_SIZE,
+                           put_timeout=settings.UPDATE_QUEUE_TIMEOUT,
+                           dedup_size=settings.UPDATE_DEDUP_SIZE)
+
+registry.gauge_callback('update_queue_size', 'Обновления Telegram, ожидающие обработки', (),
+                        lambda: {(): update_queue.qsize()})
@@ -0,0 +1,54 @@
+import hmac
+import re
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from app.config import settings
+
+# Telegram присылает обновление в виде {"update_id":123,"<тип обновления>":{...}},
+# поэтому тип можно определить по началу тела запроса, не разбирая JSON целиком
+_UPDATE_HEAD_RE = re.compile(rb'\s*\{\s*"update_id"\s*:\s*\d+\s*,\s*"([a-z_]+)"')
+
+
+class WebhookDecoder:
+    """
+    Проверка и разбор входящих запросов вебхука.
+
+    Запросы с неверным секретным токеном отклоняются до чтения тела, обновления неиспользуемых типов
+    отбрасываются по началу тела, а остальные валидируются сразу из байтов, без промежуточного dict.
+    """
+
+    def __init__(self, secret_token: str | None = None):
+        self.secret_token = secret_token
+        self.used_update_types: frozenset[str] | None = None
+
+    def set_used_update_types(self, update_types: list[str]) -> None:
+        """Запоминает типы обновлений, для которых зарегистрированы обработчики."""
+        self.used_update_types = frozenset(update_types)
+
+    def check_secret(self, header_value: str | None) -> bool:
+        """Сверяет заголовок X-Telegram-Bot-Api-Secret-Token с секретом вебхука."""
+        if not self.secret_token:
+            return True
+        if header_value is None:
+            return False
+        return hmac.compare_digest(header_value.encode(), self.secret_token.encode())
+
+    def is_unused(self, body: bytes) -> bool:
+        """
+        Возвращает True, если по началу тела видно, что обновление относится к неиспользуемому типу.
+        Если тип определить не удалось, обновление считается используемым.
+        """
+        if self.used_update_types is None:
+            return False
+        match = _UPDATE_HEAD_RE.match(body)
+        return match is not None and match.group(1).decode() not in self.used_update_types
+
+    @staticmethod
+    def decode(body: bytes, bot: Bot) -> Update:
+        """Валидирует обновление напрямую из байтов тела запроса."""
+        return Update.model_validate_json(body, context={'bot': bot})
+
+
+webhook_decoder = WebhookDecoder(secret_token=settings.WEBHOOK_SECRET)
@@ -1,13 +1,27 @@
 import os
 from datetime import datetime
+from io import BytesIO
 
-from docxtpl import DocxTemplate
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tempate_docx.docx')
+# Шаблоны документов по именам
+TEMPLATES = {'offer': TEMPLATE_PATH}
+_template_cache = None
 
 
-def fill_out_docx_template(application_data: dict):
-    template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tempate_docx.docx')
-    temp_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'temp', 'offer.docx')
-    doc = DocxTemplate(template_path)
+def get_template_cache():
+    """
+    Кэш шаблонов документов, создаётся при первом обращении. docxtpl и lxml импортируются только там,
+    где документы действительно рендерятся (в процессах пула), и не замедляют запуск приложения.
+    """
+    global _template_cache
+    if _template_cache is None:
+        from app.commercial_offer.template_cache import DocxTemplateCache
+        _template_cache = DocxTemplateCache(TEMPLATES)
+    return _template_cache
+
+
+def prepare_offer_data(application_data: dict) -> dict:
+    """Дополняет данные заявки номерами и суммами услуг, общей суммой и датой предложения."""
     all_total, num = 0, 1
     for serv in application_data['services']:
         serv['num'] = num
@@ -18,6 +32,18 @@ def fill_out_docx_template(application_data: dict):
         num += 1
     application_data['all_total'] = all_total
     application_data['date_now'] = datetime.now().strftime('%d.%m.%Y')
-    doc.render(application_data)
-    doc.save(temp_file)
-    return temp_file
+    return application_data
+
+
+def render_offer_docx(offer_data: dict, template: str = 'offer') -> bytes:
+    """Заполняет шаблон коммерческого предложения данными из prepare_offer_data и возвращает файл docx."""
+    doc = get_template_cache().get(template)
+    doc.render(offer_data)
+    output = BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def preload_templates() -> None:
+    """Разбирает шаблоны документов в текущем процессе (вызывается при запуске процессов пула рендеринга)."""
+    get_template_cache().preload()
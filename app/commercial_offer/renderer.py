@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator
+
+from app.commercial_offer.offer_docx import preload_templates, render_offer_docx
+from app.config import settings
+from app.metrics import registry, OFFER_RENDER_DURATION
+
+
+class OfferRenderer:
+    """
+    Рендеринг коммерческих предложений вне цикла событий.
+
+    docxtpl и lxml работают синхронно и заняли бы цикл событий (а вместе с ним и вебхук) на всё время
+    рендеринга, поэтому документ собирается в пуле процессов и возвращается байтами, без общего файла
+    на диске. При workers=0 рендеринг выполняется в пуле потоков по умолчанию.
+    """
+
+    def __init__(self, workers: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self.in_flight = 0
+        self.rendered = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _get_executor(self) -> Executor | None:
+        if self.workers and self._executor is None:
+            # spawn вместо fork: дочерний процесс не наследует потоки и соединения приложения
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    async def render(self, offer_data: dict) -> bytes:
+        """
+        Возвращает файл docx коммерческого предложения.
+
+        Исключения:
+            asyncio.TimeoutError: Рендеринг не уложился в timeout секунд.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        result = 'error'
+        self.in_flight += 1
+        try:
+            future = loop.run_in_executor(self._get_executor(), render_offer_docx, offer_data)
+            document = await asyncio.wait_for(future, self.timeout)
+            result = 'ok'
+        except asyncio.TimeoutError:
+            # Процесс пула при этом доработает задачу, но её результат уже никому не нужен
+            self.timeouts += 1
+            result = 'timeout'
+            logging.warning(f'Рендеринг коммерческого предложения не уложился в {self.timeout} с')
+            raise
+        except BrokenProcessPool:
+            # Процесс пула аварийно завершился, следующий вызов создаст новый пул
+            self.errors += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            latency = time.monotonic() - started
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            OFFER_RENDER_DURATION.observe(latency, result=result)
+        self.rendered += 1
+        return document
+
+    async def render_many(self, offers: list[dict], window: int | None = None) -> AsyncIterator[tuple[dict, bytes]]:
+        """
+        Рендерит несколько документов параллельно и выдаёт пары (данные, документ) в исходном порядке.
+
+        Одновременно рендерится и ожидает отправки не больше window документов (по умолчанию - два
+        на процесс пула), поэтому память не зависит от количества документов.
+        """
+        window = window or max(self.workers, 1) * 2
+        pending: deque[tuple[dict, asyncio.Task]] = deque()
+        try:
+            for offer_data in offers:
+                pending.append((offer_data, asyncio.ensure_future(self.render(offer_data))))
+                if len(pending) >= window:
+                    offer_data, task = pending.popleft()
+                    yield offer_data, await task
+            while pending:
+                offer_data, task = pending.popleft()
+                yield offer_data, await task
+        finally:
+            # Остальные документы уже не нужны: отменяем их и забираем результаты, чтобы исключения
+            # отменённых задач не остались непрочитанными
+            tasks = [task for _, task in pending]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self) -> None:
+        """Заранее запускает процессы пула и разбирает в них шаблоны, чтобы не ждать этого при первом запросе."""
+        executor = self._get_executor()
+        if executor is not None:
+            for _ in range(self.workers):
+                executor.submit(preload_templates)
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        renders = self.rendered + self.errors + self.timeouts
+        return {
+            "in_flight": self.in_flight,
+            "rendered": self.rendered,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "latency_avg": self.latency_total / renders if renders else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+offer_renderer = OfferRenderer(workers=settings.OFFER_RENDER_WORKERS, timeout=settings.OFFER_RENDER_TIMEOUT)
+
+registry.gauge_callback('offer_render_in_flight', 'Коммерческие предложения в процессе рендеринга', (),
+                        lambda: {(): offer_renderer.in_flight})
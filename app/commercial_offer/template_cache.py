@@ -0,0 +1,92 @@
+import copy
+import os
+
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment, Template
+
+
+class CachingEnvironment(Environment):
+    """Окружение Jinja, которое компилирует каждый исходный текст шаблона один раз."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._compiled: dict[str, Template] = {}
+
+    def from_string(self, source, globals=None, template_class=None) -> Template:
+        if globals is not None or template_class is not None or not isinstance(source, str):
+            return super().from_string(source, globals, template_class)
+        template = self._compiled.get(source)
+        if template is None:
+            template = self._compiled[source] = super().from_string(source)
+        return template
+
+
+class ParsedDocxTemplate:
+    """
+    Разобранный шаблон docx: документ, исправленный XML частей и скомпилированные Jinja шаблоны.
+
+    Каждый рендеринг получает копию разобранного документа (new_template), поэтому повторно не нужно
+    распаковывать файл, разбирать XML, исправлять теги и компилировать Jinja.
+    """
+
+    def __init__(self, path: str, mtime: int):
+        self.path = path
+        self.mtime = mtime
+        self.document = Document(path)
+        self.jinja_env = CachingEnvironment()
+        self.patched_xml: dict[str, str] = {}
+
+    def new_template(self) -> DocxTemplate:
+        return _ClonedDocxTemplate(self)
+
+
+class _ClonedDocxTemplate(DocxTemplate):
+    """DocxTemplate поверх копии разобранного документа, использующий кэши ParsedDocxTemplate."""
+
+    def __init__(self, parsed: ParsedDocxTemplate):
+        super().__init__(parsed.path)
+        self.parsed = parsed
+        self.docx = copy.deepcopy(parsed.document)
+
+    def patch_xml(self, src_xml):
+        patched = self.parsed.patched_xml.get(src_xml)
+        if patched is None:
+            patched = self.parsed.patched_xml[src_xml] = super().patch_xml(src_xml)
+        return patched
+
+    def render(self, context, jinja_env=None, autoescape=False) -> None:
+        if jinja_env is None and not autoescape:
+            jinja_env = self.parsed.jinja_env
+        super().render(context, jinja_env, autoescape)
+
+
+class DocxTemplateCache:
+    """
+    Кэш разобранных шаблонов docx в пределах процесса (в пуле рендеринга - у каждого процесса свой).
+
+    Шаблоны регистрируются под именами, файл перечитывается при изменении времени его модификации.
+    """
+
+    def __init__(self, templates: dict[str, str]):
+        self.templates = templates
+        self._parsed: dict[str, ParsedDocxTemplate] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str) -> DocxTemplate:
+        """Возвращает новый, готовый к рендерингу DocxTemplate для шаблона name."""
+        path = self.templates[name]
+        mtime = os.stat(path).st_mtime_ns
+        parsed = self._parsed.get(name)
+        if parsed is None or parsed.mtime != mtime:
+            self.misses += 1
+            parsed = self._parsed[name] = ParsedDocxTemplate(path, mtime)
+        else:
+            self.hits += 1
+        return parsed.new_template()
+
+    def preload(self) -> None:
+        """Разбирает все зарегистрированные шаблоны заранее."""
+        for name in self.templates:
+            self.get(name)
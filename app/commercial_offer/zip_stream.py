@@ -0,0 +1,36 @@
+import time
+import zipfile
+from typing import AsyncIterable, AsyncIterator
+
+
+class _ZipOutput:
+    """Поток без перемотки для zipfile: накапливает записанные байты до их отправки клиенту."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+async def zip_stream(files: AsyncIterable[tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    Собирает ZIP архив на лету: каждый файл отдаётся сразу после записи, архив целиком в памяти не хранится.
+
+    Файлы docx уже сжаты, поэтому записываются без повторного сжатия (ZIP_STORED).
+    """
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        async for name, data in files:
+            archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data)
+            yield output.pop()
+    # Центральный каталог архива
+    yield output.pop()
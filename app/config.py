@@ -1,4 +1,6 @@
 import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,6 +8,88 @@ class Settings(BaseSettings):
     BOT_TOKEN: str
     BASE_SITE: str
     ADMIN_ID: int
+    # Адрес сервера Bot API (None - api.telegram.org), например локальный сервер Bot API или имитация для нагрузочных тестов
+    TELEGRAM_API_URL: str | None = None
+    # Строка подключения к базе данных: sqlite+aiosqlite:///... или postgresql+asyncpg://...
+    DATABASE_URL: str = 'sqlite+aiosqlite:///db.sqlite3'
+    # Пул соединений: постоянные соединения, дополнительные соединения сверх них,
+    # время жизни соединения (в секундах) и проверка соединения перед выдачей из пула
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Размер кэша подготовленных запросов asyncpg на соединение (0 - отключить, нужно для pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Время (в секундах), в течение которого клиент может использовать справочник обучения без перепроверки
+    CATALOG_MAX_AGE: int = 60
+    # Сколько зарегистрированных пользователей помнить в памяти, чтобы повторный /start не обращался к базе данных
+    KNOWN_USERS_CACHE_SIZE: int = 10000
+    # Как часто (в секундах) процесс сверяет версии своих кэшей в памяти (справочник обучения, зарегистрированные
+    # пользователи) с базой данных: изменения, сделанные другим воркером uvicorn, видны не позже чем через это время
+    CACHE_VERSION_TTL: float = 5
+    # Количество заявок на одной странице списков заявок
+    APPLICATIONS_PAGE_SIZE: int = 20
+    # Архив заявок администратора отдаётся одной потоковой страницей без пагинации
+    ARCHIVE_STREAM: bool = True
+    # Количество заявок, выбираемых из базы данных за раз при потоковой выдаче архива
+    ARCHIVE_STREAM_BATCH: int = 200
+    # Секретный токен вебхука, Telegram передаёт его в заголовке X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_SECRET: str | None = None
+    # При запуске вебхук устанавливается, только если адрес или типы обновлений в Telegram отличаются;
+    # True - устанавливать всегда (нужно после смены WEBHOOK_SECRET, его нельзя прочитать из getWebhookInfo)
+    WEBHOOK_FORCE_SET: bool = False
+    # Отбрасывать при установке вебхука обновления, накопившиеся в Telegram (например, за время перезапуска)
+    WEBHOOK_DROP_PENDING: bool = False
+    # Удалять вебхук при остановке (False - Telegram копит обновления до следующего запуска)
+    WEBHOOK_DELETE_ON_SHUTDOWN: bool = False
+    # Способ получения обновлений: webhook - Telegram присылает их на BASE_SITE/webhook, polling - бот сам
+    # запрашивает их через getUpdates (когда BASE_SITE недоступен из интернета), вебхук при этом удаляется
+    BOT_MODE: Literal['webhook', 'polling'] = 'webhook'
+    # Long polling: сколько секунд Telegram держит запрос getUpdates в ожидании обновлений
+    # и сколько обновлений отдаёт за один запрос (не больше 100)
+    POLLING_TIMEOUT: int = 30
+    POLLING_LIMIT: int = 100
+    # Ограничения исходящих запросов к Telegram: сообщений в секунду всего и в один чат,
+    # допустимый всплеск для чата, одновременных запросов и повторов после ответа 429
+    OUTBOUND_RATE: float = 30
+    OUTBOUND_CHAT_RATE: float = 1
+    OUTBOUND_CHAT_BURST: int = 3
+    OUTBOUND_CONCURRENCY: int = 10
+    OUTBOUND_MAX_RETRIES: int = 3
+    # Доставка сообщений из outbox: интервал опроса, размер порции, число попыток
+    # и границы экспоненциальной задержки между попытками (в секундах)
+    OUTBOX_POLL_INTERVAL: float = 5
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_BASE: float = 5
+    OUTBOX_RETRY_MAX: float = 3600
+    # Вебхук ставит обновления в очередь и сразу отвечает Telegram (False - обработка прямо в запросе)
+    WEBHOOK_QUEUE: bool = True
+    # Количество воркеров обработки обновлений
+    UPDATE_WORKERS: int = 8
+    # Максимальное количество обновлений, ожидающих обработки
+    UPDATE_QUEUE_SIZE: int = 1000
+    # Сколько секунд вебхук ждёт места в очереди, прежде чем ответить 503
+    UPDATE_QUEUE_TIMEOUT: float = 5.0
+    # Сколько последних update_id помнить для отбрасывания повторных доставок
+    UPDATE_DEDUP_SIZE: int = 10000
+    # Процессы рендеринга коммерческих предложений (0 - рендерить в потоке) и предельное время рендеринга
+    OFFER_RENDER_WORKERS: int = 2
+    OFFER_RENDER_TIMEOUT: float = 30
+    # Архив массовой подготовки предложений собирается целиком до отправки: в памяти до этого размера
+    # (в байтах), дальше во временном файле
+    BULK_OFFERS_SPOOL_SIZE: int = 16 * 1024 * 1024
+    # Отдавать метрики Prometheus по адресу /metrics
+    METRICS_ENABLED: bool = True
+    # Профилировщик SQL: порог медленного запроса (в миллисекундах) и сколько раз один и тот же запрос
+    # может выполниться за один HTTP запрос или обновление, прежде чем это будет отмечено как N+1
+    SQL_PROFILER: bool = False
+    SQL_SLOW_QUERY_MS: float = 100
+    SQL_REPEAT_THRESHOLD: int = 5
+    # Файл блокировки для выбора ведущего процесса при запуске нескольких воркеров uvicorn (None - файл
+    # во временном каталоге по id бота) и интервал (в секундах), с которым ведомые процессы пробуют её взять
+    LEADER_LOCK_FILE: str | None = None
+    LEADER_RETRY_INTERVAL: float = 5
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
 
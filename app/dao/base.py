@@ -1,12 +1,84 @@
-from sqlalchemy.exc import SQLAlchemyError
+import functools
+import inspect
+import sys
+import time
+from contextvars import ContextVar
+
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func
+from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func, or_
+
+from app.dao.session import read_session, write_session, after_commit
+from app.metrics import DAO_CALL_DURATION, DAO_CALL_ERRORS
+from app.profiler import query_profiler
+
+# Измеряемый сейчас метод DAO: (имя класса, имя метода)
+_observed_call: ContextVar[tuple[str, str] | None] = ContextVar('observed_dao_call', default=None)
+
+
+def observe_dao_method(method_name: str, func):
+    """
+    Оборачивает асинхронный метод DAO: длительность и исключения вызовов попадают в метрики,
+    а запросы к базе данных получают в профилировщике место вызова.
+
+    Если метод наследника вызывает тот же метод базового класса (super()), измеряется только внешний вызов.
+    """
 
-from app.database import async_session_maker
+    @functools.wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        call = (cls.__name__, method_name)
+        if _observed_call.get() == call:
+            return await func(cls, *args, **kwargs)
+        token = _observed_call.set(call)
+        started = time.perf_counter()
+        try:
+            with query_profiler.call_site(f'{cls.__name__}.{method_name}', sys._getframe(1)):
+                return await func(cls, *args, **kwargs)
+        except Exception:
+            DAO_CALL_ERRORS.inc(dao=cls.__name__, method=method_name)
+            raise
+        finally:
+            DAO_CALL_DURATION.observe(time.perf_counter() - started, dao=cls.__name__, method=method_name)
+            _observed_call.reset(token)
+
+    return wrapper
 
 
 class BaseDAO:
+    """
+    Базовый DAO. Каждый метод по умолчанию работает в собственной сессии, а внутри unit_of_work()
+    (см. app.dao.session) присоединяется к общей сессии запроса.
+
+    Публичные асинхронные методы BaseDAO и наследников автоматически измеряются (см. app.metrics).
+    """
     model = None
+    # Версия кэша в памяти процессов, который зависит от таблицы модели: увеличивается в транзакции
+    # каждой записи, чтобы другие процессы приложения сбросили свой кэш (см. app.dao.cache_version)
+    cache_version = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._observe_methods()
+
+    @classmethod
+    def _observe_methods(cls) -> None:
+        """Оборачивает публичные асинхронные classmethod, объявленные в самом классе."""
+        for name, attr in list(vars(cls).items()):
+            if (not name.startswith('_') and isinstance(attr, classmethod)
+                    and inspect.iscoroutinefunction(attr.__func__)):
+                setattr(cls, name, classmethod(observe_dao_method(name, attr.__func__)))
+
+    @classmethod
+    async def _bump_cache_version(cls, session) -> None:
+        if cls.cache_version is not None:
+            await cls.cache_version.bump(session)
+
+    @classmethod
+    def on_change(cls) -> None:
+        """
+        Вызывается после успешной записи (add, add_many, update, delete) в таблицу модели.
+        Наследники переопределяют метод, чтобы сбросить зависящие от таблицы кэши.
+        """
 
     @classmethod
     async def find_one_or_none_by_id(cls, data_id: int):
@@ -19,11 +91,32 @@ class BaseDAO:
         Возвращает:
             Экземпляр модели или None, если ничего не найдено.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(id=data_id)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
+    @classmethod
+    async def find_many_by_ids(cls, data_ids: list[int]) -> list:
+        """
+        Асинхронно находит экземпляры модели по списку идентификаторов одним запросом (WHERE id IN (...)).
+
+        Аргументы:
+            data_ids: Список идентификаторов записей, может содержать повторы.
+
+        Возвращает:
+            Список той же длины и в том же порядке, что и data_ids. На месте идентификаторов,
+            для которых запись не найдена, стоит None.
+        """
+        if not data_ids:
+            return []
+        primary_key = cls.model.__mapper__.primary_key[0]
+        async with read_session() as session:
+            query = select(cls.model).where(primary_key.in_(set(data_ids)))
+            result = await session.execute(query)
+            found = {getattr(instance, primary_key.key): instance for instance in result.scalars()}
+        return [found.get(data_id) for data_id in data_ids]
+
     @classmethod
     async def find_one_or_none(cls, **filter_by):
         """
@@ -35,7 +128,7 @@ class BaseDAO:
         Возвращает:
             Экземпляр модели или None, если ничего не найдено.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -51,7 +144,7 @@ class BaseDAO:
         Возвращает:
             Список экземпляров модели, удовлетворяющих критериям. Если ничего не найдено, возвращает пустой список.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalars().all()
@@ -67,16 +160,12 @@ class BaseDAO:
         Возвращает:
             Созданный экземпляр модели.
         """
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_instance = cls.model(**values)
-                session.add(new_instance)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instance
+        async with write_session() as session:
+            new_instance = cls.model(**values)
+            session.add(new_instance)
+            await cls._bump_cache_version(session)
+        after_commit(cls.on_change)
+        return new_instance
 
     @classmethod
     async def add_many(cls, instances: list[dict]) -> list:
@@ -89,16 +178,51 @@ class BaseDAO:
         Возвращает:
             Список созданных экземпляров модели.
         """
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_instances = [cls.model(**values) for values in instances]
-                session.add_all(new_instances)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instances
+        async with write_session() as session:
+            new_instances = [cls.model(**values) for values in instances]
+            session.add_all(new_instances)
+            await cls._bump_cache_version(session)
+        after_commit(cls.on_change)
+        return new_instances
+
+    @classmethod
+    async def upsert(cls, update_columns: tuple[str, ...] = (), **values) -> bool:
+        """
+        Асинхронно добавляет запись или, если запись с таким первичным ключом уже есть, обновляет в ней
+        поля update_columns (INSERT ... ON CONFLICT, поддерживаются SQLite и PostgreSQL).
+
+        Оба запроса выполняются в одной транзакции, поэтому одновременные вызовы с одним ключом не приводят
+        к IntegrityError: запись добавит один из них, остальные обновят её. Поля обновляются и updated_at
+        меняется, только если новые значения отличаются от сохранённых.
+
+        Аргументы:
+            update_columns: Поля, обновляемые у существующей записи.
+            **values: Именованные параметры записи, включая первичный ключ.
+
+        Возвращает:
+            bool: True, если запись была добавлена, False, если она уже существовала.
+        """
+        table = cls.model.__table__
+        primary_key = [column.name for column in table.primary_key]
+        async with write_session() as session:
+            dialect = session.get_bind().dialect.name
+            insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect)
+            if insert is None:
+                raise NotImplementedError(f'upsert не поддерживается для {dialect}')
+            query = insert(table).values(**values).on_conflict_do_nothing(index_elements=primary_key)
+            result = await session.execute(query.returning(*table.primary_key))
+            inserted = result.first() is not None
+            if not inserted and update_columns:
+                query = insert(table).values(**values)
+                query = query.on_conflict_do_update(
+                    index_elements=primary_key,
+                    set_={**{name: query.excluded[name] for name in update_columns}, 'updated_at': func.now()},
+                    where=or_(*(table.c[name].is_distinct_from(query.excluded[name]) for name in update_columns)),
+                )
+                await session.execute(query)
+            await cls._bump_cache_version(session)
+        after_commit(cls.on_change)
+        return inserted
 
     @classmethod
     async def update(cls, filter_by: dict, **values) -> int:
@@ -112,21 +236,17 @@ class BaseDAO:
         Возвращает:
             int: Количество строк, которые были обновлены.
         """
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = (
-                    sqlalchemy_update(cls.model)
-                    .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
-                    .values(**values)
-                    .execution_options(synchronize_session="fetch")
-                )
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+        async with write_session() as session:
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+                .values(**values)
+                .execution_options(synchronize_session="fetch")
+            )
+            result = await session.execute(query)
+            await cls._bump_cache_version(session)
+        after_commit(cls.on_change)
+        return result.rowcount
 
     @classmethod
     async def delete(cls, delete_all: bool = False, **filter_by) -> int:
@@ -144,16 +264,12 @@ class BaseDAO:
         if not delete_all and not filter_by:
             raise ValueError("Нужен хотя бы один фильтр для удаления.")
 
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+        async with write_session() as session:
+            query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
+            result = await session.execute(query)
+            await cls._bump_cache_version(session)
+        after_commit(cls.on_change)
+        return result.rowcount
 
     @classmethod
     async def count(cls, **filter_by) -> int:
@@ -166,7 +282,7 @@ class BaseDAO:
         Возвращает:
             int: Количество экземпляров модели, соответствующих критериям.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(func.count(cls.model.id)).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalar()
@@ -182,7 +298,10 @@ class BaseDAO:
         Возвращает:
             bool: True, если хотя бы один экземпляр соответствует критериям; иначе False.
         """
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(**filter_by).exists()
+        async with read_session() as session:
+            query = select(select(cls.model).filter_by(**filter_by).exists())
             result = await session.execute(query)
             return result.scalar()
+
+
+BaseDAO._observe_methods()
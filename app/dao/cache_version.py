@@ -0,0 +1,62 @@
+import time
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dao.session import after_commit
+from app.database import async_session_maker
+from app.models import CacheVersion
+
+
+class SharedCacheVersion:
+    """
+    Версия кэша в памяти процесса, общая для всех процессов приложения (uvicorn --workers N).
+
+    Запись в одном процессе сбрасывает кэш только этого процесса, поэтому вместе с данными в той же транзакции
+    увеличивается версия в таблице cache_versions (bump), а каждый процесс не чаще раза в ttl секунд сверяет
+    её с прочитанной ранее (changed) и при расхождении сбрасывает свой кэш. Собственные записи процесс
+    учитывает сам и повторно из-за них кэш не сбрасывает.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._version: int | None = None
+        self._checked_at: float | None = None
+
+    async def changed(self) -> bool:
+        """
+        Возвращает True, если с прошлой проверки версию изменил другой процесс. Обращается к базе данных
+        не чаще раза в ttl секунд, в остальное время сразу возвращает False.
+        """
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.ttl:
+            return False
+        self._checked_at = now
+        async with async_session_maker() as session:
+            version = await session.scalar(select(CacheVersion.version).where(CacheVersion.name == self.name)) or 0
+        changed = self._version is not None and version != self._version
+        self._version = version
+        return changed
+
+    async def bump(self, session: AsyncSession) -> None:
+        """Увеличивает версию в транзакции session (вместе с записью данных кэша)."""
+        dialect = session.get_bind().dialect.name
+        insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect)
+        if insert is None:
+            raise NotImplementedError(f'Версии кэшей не поддерживаются для {dialect}')
+        query = insert(CacheVersion).values(name=self.name, version=1)
+        query = query.on_conflict_do_update(index_elements=['name'], set_={'version': CacheVersion.version + 1})
+        version = await session.scalar(query.returning(CacheVersion.version))
+        after_commit(lambda: self._written(version))
+
+    def _written(self, version: int) -> None:
+        # Если между прочитанной версией и записанной не было чужих записей, кэш процесса актуален
+        if self._version == version - 1:
+            self._version = version
+
+    def reset(self) -> None:
+        """Забывает прочитанную версию, следующая проверка прочитает её заново."""
+        self._version = None
+        self._checked_at = None
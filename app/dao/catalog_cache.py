@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import json
+
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.dao.cache_version import SharedCacheVersion
+from app.database import async_session_maker
+from app.metrics import registry
+from app.models import TrainingType, TrainingProgram
+
+
+def _dump(content: dict) -> bytes:
+    # Тот же формат, что у fastapi.responses.JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+_EMPTY_PROGRAMS = _dump({"programs": []})
+
+
+class CatalogCache:
+    """
+    Кэш справочника обучения (виды обучения -> программы обучения) в памяти процесса.
+
+    Дерево загружается из базы данных один раз при первом обращении и хранится до вызова invalidate(),
+    который выполняется DAO при любой записи в таблицы training_types / training_programs. Записи других
+    процессов приложения обнаруживаются по версии shared_version не позже чем через её ttl секунд.
+    """
+
+    def __init__(self, shared_version: SharedCacheVersion):
+        self.shared_version = shared_version
+        self._types: list[dict] | None = None
+        self._programs: dict[int, list[dict]] = {}
+        # Заранее сериализованные ответы эндпоинтов и их ETag
+        self._types_body = b''
+        self._programs_bodies: dict[int, bytes] = {}
+        self._etag = ''
+        self._lock = asyncio.Lock()
+        # Увеличивается при каждом сбросе, чтобы не сохранить данные загрузки, начатой до записи
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def _load(self) -> None:
+        version = self.version
+        async with async_session_maker() as session:
+            types = await session.execute(
+                select(TrainingType.id, TrainingType.name).order_by(TrainingType.id)
+            )
+            programs = await session.execute(
+                select(TrainingProgram.id, TrainingProgram.name, TrainingProgram.training_type_id)
+                .order_by(TrainingProgram.id)
+            )
+        programs_by_type = {}
+        for program_id, name, type_id in programs:
+            programs_by_type.setdefault(type_id, []).append({"id": program_id, "name": name})
+        types_list = [{"id": type_id, "name": name} for type_id, name in types]
+        types_body = _dump({"types": types_list})
+        programs_bodies = {type_id: _dump({"programs": items}) for type_id, items in programs_by_type.items()}
+        digest = hashlib.blake2b(types_body, digest_size=8)
+        for type_id in sorted(programs_bodies):
+            digest.update(programs_bodies[type_id])
+        if version != self.version:
+            return
+        self._types_body = types_body
+        self._programs_bodies = programs_bodies
+        self._etag = f'"catalog-{digest.hexdigest()}"'
+        self._programs = programs_by_type
+        self._types = types_list
+
+    async def _ensure_loaded(self) -> None:
+        if await self.shared_version.changed():
+            self.invalidate()
+        if self._types is not None:
+            self.hits += 1
+            return
+        async with self._lock:
+            # Пока ждали блокировку, справочник мог загрузить другой запрос
+            if self._types is not None:
+                self.hits += 1
+                return
+            self.misses += 1
+            while self._types is None:
+                await self._load()
+
+    async def get_types(self) -> list[dict]:
+        """Возвращает список видов обучения в виде словарей {"id", "name"}."""
+        await self._ensure_loaded()
+        return self._types
+
+    async def get_programs(self, type_id: int) -> list[dict]:
+        """Возвращает список программ обучения для указанного вида обучения."""
+        await self._ensure_loaded()
+        return self._programs.get(type_id, [])
+
+    async def get_etag(self) -> str:
+        """
+        Возвращает ETag текущей версии справочника, при необходимости загружая его.
+
+        ETag вычисляется по содержимому, поэтому он меняется только вместе с данными справочника
+        и совпадает между перезапусками и разными процессами приложения.
+        """
+        await self._ensure_loaded()
+        return self._etag
+
+    @property
+    def types_body(self) -> bytes:
+        """JSON-ответ /get_training_types, актуален после вызова get_etag()."""
+        return self._types_body
+
+    def programs_body(self, type_id: int) -> bytes:
+        """JSON-ответ /get_programs для вида обучения, актуален после вызова get_etag()."""
+        return self._programs_bodies.get(type_id, _EMPTY_PROGRAMS)
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш, следующее обращение заново загрузит справочник из базы данных."""
+        self.version += 1
+        self._types = None
+        self._programs = {}
+        self._types_body = b''
+        self._programs_bodies = {}
+        self._etag = ''
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "version": self.version,
+                "loaded": self._types is not None}
+
+
+catalog_cache = CatalogCache(SharedCacheVersion('catalog', ttl=settings.CACHE_VERSION_TTL))
+
+registry.counter_callback('catalog_cache_lookups_total', 'Обращения к кэшу справочника обучения', ('result',),
+                          lambda: {('hit',): catalog_cache.hits, ('miss',): catalog_cache.misses})
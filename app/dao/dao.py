@@ -1,103 +1,282 @@
+from decimal import Decimal
+from typing import AsyncIterator, Callable
+
+from sqlalchemy import case, func, update as sqlalchemy_update
 from sqlalchemy.future import select
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload, selectinload
 
 from app.dao.base import BaseDAO
-from app.database import async_session_maker
-from app.models import User, TrainingType, TrainingProgram, Application, ApplicationService
+from app.dao.catalog_cache import catalog_cache
+from app.dao.rows import ApplicationRow, build_application_rows
+from app.dao.session import after_commit, read_session, stream_session, unit_of_work, write_session
+from app.dao.user_cache import known_users
+from app.models import (User, TrainingType, TrainingProgram, Application, ApplicationStatus, ApplicationService,
+                        OutboxMessage, utcnow)
 
 
 class UserDAO(BaseDAO):
     model = User
 
+    @classmethod
+    async def register(cls, telegram_id: int, first_name: str, username: str | None) -> bool:
+        """
+        Сохраняет пользователя или обновляет его first_name и username одним upsert. Если пользователь уже
+        сохранён с тем же именем (см. known_users), обращения к базе данных нет.
+
+        Возвращает:
+            bool: True, если пользователь новый.
+        """
+        profile = (first_name, username)
+        await known_users.revalidate()
+        if known_users.is_known(telegram_id, profile):
+            return False
+        inserted = await cls.upsert(update_columns=('first_name', 'username'),
+                                    telegram_id=telegram_id, first_name=first_name, username=username)
+        after_commit(lambda: known_users.remember(telegram_id, profile))
+        return inserted
+
+    @classmethod
+    async def delete(cls, delete_all: bool = False, **filter_by) -> int:
+        async with unit_of_work():
+            deleted = await super().delete(delete_all, **filter_by)
+            # Удалённые пользователи не должны считаться зарегистрированными ни в этом процессе, ни в других
+            async with write_session() as session:
+                await known_users.shared_version.bump(session)
+            after_commit(known_users.clear)
+        return deleted
+
 
 class TrainingProgramDAO(BaseDAO):
     model = TrainingProgram
+    cache_version = catalog_cache.shared_version
+
+    @classmethod
+    def on_change(cls) -> None:
+        catalog_cache.invalidate()
 
 
 class TrainingTypeDAO(BaseDAO):
     model = TrainingType
+    cache_version = catalog_cache.shared_version
+
+    @classmethod
+    def on_change(cls) -> None:
+        catalog_cache.invalidate()
 
 
 class ApplicationDAO(BaseDAO):
     model = Application
 
     @classmethod
-    async def add_model(cls, **values):
+    async def add_model(cls, outbox: Callable[[int], list[dict]] | None = None, **values):
+        """
+        Создаёт заявку вместе с услугами.
+
+        Аргументы:
+            outbox: Функция, которая по id новой заявки возвращает сообщения для OutboxMessage.
+                    Сообщения записываются в той же транзакции, что и заявка.
+            **values: Поля заявки и список services с данными услуг.
+
+        Возвращает:
+            Созданный экземпляр заявки и его id.
+        """
         services_data = values.pop('services', [])
 
-        async with async_session_maker() as session:
-            async with session.begin():
-                # Создаем основную заявку
-                new_instance = cls.model(**values)
-                service_instances = [
-                    ApplicationService(**service_data, application=new_instance) for service_data in services_data
-                ]
-                session.add(new_instance)
-                session.add_all(service_instances)
-                try:
-                    await session.flush()  # Применяет изменения к БД и обновляет объект
-                    instance_id = new_instance.id  # Получаем id до коммита
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instance, instance_id
+        async with write_session() as session:
+            # Создаем основную заявку
+            new_instance = cls.model(**values)
+            service_instances = [
+                ApplicationService(**service_data, application=new_instance) for service_data in services_data
+            ]
+            session.add(new_instance)
+            session.add_all(service_instances)
+            await session.flush()  # Применяет изменения к БД и обновляет объект
+            instance_id = new_instance.id  # Получаем id до коммита
+            if outbox:
+                session.add_all([OutboxMessage(**message) for message in outbox(instance_id)])
+        return new_instance, instance_id
+
+    @staticmethod
+    def _applications_query(user_id: int | None, admin: bool = False, in_work: bool | None = None,
+                            before_id: int | None = None, limit: int | None = None,
+                            application_ids: list[int] | None = None):
+        """
+        Запрос заявок с услугами, от новых к старым (аргументы описаны в get_applications).
+
+        Выбираются только поля, которые нужны для вывода, без загрузки объектов ORM: одна строка на услугу,
+        строки одной заявки идут подряд (см. build_application_rows). Фильтры и limit применяются к заявкам
+        во вложенном запросе, поэтому limit ограничивает количество заявок, а не строк.
+        """
+        applications = select(Application.id, Application.company_name, Application.phone_number,
+                              Application.email, Application.status, Application.offer_total, Application.user_id)
+        if not admin:
+            applications = applications.where(Application.user_id == user_id)
+        if in_work is not None:
+            # Сравнение на равенство с перечнем статусов, чтобы использовался индекс по status
+            applications = applications.where(Application.status.in_(
+                [status for status in ApplicationStatus if (status == ApplicationStatus.IN_WORK) == in_work]
+            ))
+        if before_id is not None:
+            applications = applications.where(Application.id < before_id)
+        if application_ids is not None:
+            applications = applications.where(Application.id.in_(application_ids))
+        if limit is not None:
+            applications = applications.order_by(Application.id.desc()).limit(limit)
+        applications = applications.subquery()
+        return (
+            select(applications, TrainingType.name, TrainingProgram.name,
+                   ApplicationService.people_count, ApplicationService.training_rank)
+            .outerjoin(ApplicationService, ApplicationService.application_id == applications.c.id)
+            .outerjoin(TrainingType, TrainingType.id == ApplicationService.training_type_id)
+            .outerjoin(TrainingProgram, TrainingProgram.id == ApplicationService.training_program_id)
+            .order_by(applications.c.id.desc(), ApplicationService.id)
+        )
+
+    @classmethod
+    async def get_applications(cls, user_id: int | None, admin: bool = False, in_work: bool | None = None,
+                               before_id: int | None = None, limit: int | None = None) -> list[ApplicationRow]:
+        """
+        Возвращает заявки с услугами, от новых к старым.
+
+        Аргументы:
+            user_id: Пользователь, заявки которого нужно вернуть (не учитывается, если admin=True).
+            admin: Вернуть заявки всех пользователей.
+            in_work: True - только заявки в работе, False - только отработанные, None - все.
+            before_id: Курсор страницы, вернуть только заявки с id меньше указанного.
+            limit: Максимальное количество заявок.
+        """
+        async with read_session() as session:
+            query = cls._applications_query(user_id, admin=admin, in_work=in_work, before_id=before_id, limit=limit)
+            result = await session.execute(query)
+            return build_application_rows(result.tuples())
+
+    @classmethod
+    async def get_applications_by_ids(cls, application_ids: list[int]) -> list[dict]:
+        """
+        Возвращает заявки с услугами по списку id (от новых к старым), отсутствующие id пропускаются.
+        Заявки возвращаются словарями, которые можно дополнять (см. prepare_offer_data).
+        """
+        async with read_session() as session:
+            query = cls._applications_query(None, admin=True, application_ids=application_ids)
+            result = await session.execute(query)
+            return [application.as_dict() for application in build_application_rows(result.tuples())]
+
+    @classmethod
+    async def stream_applications(cls, user_id: int | None, admin: bool = False, in_work: bool | None = None,
+                                  batch_size: int = 200) -> AsyncIterator[ApplicationRow]:
+        """
+        Выдаёт заявки по одной, выбирая из базы данных порциями по batch_size строк через серверный курсор.
+        В памяти одновременно находится не больше одной порции, сколько бы заявок ни было.
+
+        Генератор держит собственную сессию и соединение до окончания перебора, поэтому его нужно
+        дочитать или закрыть (aclose).
+        """
+        async with stream_session() as session:
+            query = cls._applications_query(user_id, admin=admin, in_work=in_work)
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            # Услуги последней заявки порции могут продолжиться в следующей порции
+            pending = None
+            async for partition in result.tuples().partitions():
+                for application in build_application_rows(partition):
+                    if pending is not None and pending.id == application.id:
+                        pending.services.extend(application.services)
+                        continue
+                    if pending is not None:
+                        yield pending
+                    pending = application
+            if pending is not None:
+                yield pending
+
+    @classmethod
+    async def get_applications_page(cls, user_id: int | None, admin: bool = False, in_work: bool | None = None,
+                                    before_id: int | None = None,
+                                    page_size: int = 20) -> tuple[list[ApplicationRow], int | None]:
+        """
+        Возвращает страницу заявок (keyset пагинация по id) и курсор следующей страницы.
+
+        Возвращает:
+            Список заявок и значение before_id для следующей страницы или None, если страница последняя.
+        """
+        applications = await cls.get_applications(user_id, admin=admin, in_work=in_work,
+                                                  before_id=before_id, limit=page_size + 1)
+        if len(applications) > page_size:
+            applications = applications[:page_size]
+            return applications, applications[-1].id
+        return applications, None
+
+    @classmethod
+    async def set_offers(cls, offer_totals: dict[int, Decimal]) -> int:
+        """
+        Переводит заявки в статус OFFER с указанными суммами предложений одним запросом UPDATE.
+
+        Аргументы:
+            offer_totals: Словарь {id заявки: сумма предложения}.
+
+        Возвращает:
+            Количество обновлённых заявок.
+        """
+        if not offer_totals:
+            return 0
+        async with write_session() as session:
+            query = (
+                sqlalchemy_update(Application)
+                .where(Application.id.in_(offer_totals))
+                .values(status=ApplicationStatus.OFFER, offer_total=case(offer_totals, value=Application.id))
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(query)
+        after_commit(cls.on_change)
+        return result.rowcount
 
     @classmethod
-    async def get_applications(cls, user_id: int, admin: bool = False):
-        async with async_session_maker() as session:
-            async with session.begin():
-                if admin:
-                    query = (
-                        select(Application)
-                        .options(
-                            joinedload(Application.services)
-                            .joinedload(ApplicationService.training_type),
-                            joinedload(Application.services)
-                            .joinedload(ApplicationService.training_program)
-                        )
-                    )
-                else:
-                    query = (
-                        select(Application)
-                        .options(
-                            joinedload(Application.services)
-                            .joinedload(ApplicationService.training_type),
-                            joinedload(Application.services)
-                            .joinedload(ApplicationService.training_program)
-                        )
-                        .filter_by(user_id=user_id)
-                    )
-
-                result = await session.execute(query)
-
-                applications = result.unique().scalars().all()  # Извлекаем все экземпляры Application
-
-                # Преобразуем объекты в словари для удобного вывода
-                applications_data = [
-                    {
-                        "id": app.id,
-                        "company_name": app.company_name,
-                        "phone_number": app.phone_number,
-                        "email": app.email,
-                        "status": app.status,
-                        "user_id": app.user_id,
-                        "services": [
-                            {
-                                "training_type": service.training_type.name,
-                                "training_program": service.training_program.name,
-                                "people_count": service.people_count,
-                                "training_rank": service.training_rank,
-                            }
-                            for service in app.services
-                        ],
-                    }
-                    for app in applications
-                ]
-
-                return applications_data
+    async def get_status_summary(cls) -> dict[ApplicationStatus, dict]:
+        """
+        Возвращает количество заявок и сумму коммерческих предложений по каждому статусу.
+
+        Возвращает:
+            Словарь {статус: {"count": количество заявок, "offer_total": сумма предложений}}.
+        """
+        async with read_session() as session:
+            query = (
+                select(Application.status, func.count(), func.coalesce(func.sum(Application.offer_total), 0))
+                .group_by(Application.status)
+            )
+            result = await session.execute(query)
+            summary = {status: {"count": 0, "offer_total": Decimal(0)} for status in ApplicationStatus}
+            for status, count, offer_total in result:
+                summary[ApplicationStatus(status)] = {"count": count, "offer_total": Decimal(str(offer_total))}
+            return summary
 
 
 class ApplicationServiceDAO(BaseDAO):
     model = ApplicationService
+
+
+class OutboxMessageDAO(BaseDAO):
+    model = OutboxMessage
+
+    @classmethod
+    async def get_due(cls, limit: int, max_attempts: int) -> list[OutboxMessage]:
+        """Возвращает недоставленные сообщения, время очередной попытки отправки которых наступило."""
+        async with read_session() as session:
+            query = (
+                select(cls.model)
+                .where(cls.model.delivered_at.is_(None),
+                       cls.model.attempts < max_attempts,
+                       cls.model.next_attempt_at <= utcnow())
+                .order_by(cls.model.id)
+                .limit(limit)
+            )
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def mark_delivered(cls, message_ids: list[int]) -> int:
+        """Отмечает сообщения доставленными."""
+        async with write_session() as session:
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(cls.model.id.in_(message_ids))
+                .values(delivered_at=utcnow())
+            )
+            result = await session.execute(query)
+        return result.rowcount
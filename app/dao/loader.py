@@ -0,0 +1,75 @@
+import asyncio
+
+
+class BatchLoader:
+    """
+    Объединяет одиночные запросы записей по id в один запрос find_many_by_ids (аналог DataLoader).
+
+    Все вызовы load(), сделанные до следующей итерации цикла событий, выполняются одним запросом
+    WHERE id IN (...). Результаты запоминаются, поэтому загрузчик создаётся на один запрос (HTTP или
+    обновление Telegram) и не должен жить дольше него.
+
+    Запросы загрузчика выполняются по очереди, поэтому его можно использовать внутри unit_of_work():
+    сессия единицы работы не используется двумя запросами одновременно.
+
+    Пример:
+        loader = BatchLoader(TrainingProgramDAO)
+        programs = await asyncio.gather(*(loader.load(i) for i in program_ids))
+    """
+
+    def __init__(self, dao):
+        self.dao = dao
+        self._futures: dict[int, asyncio.Future] = {}
+        self._pending: list[int] = []
+        self._dispatches: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    def load(self, data_id: int) -> asyncio.Future:
+        """Возвращает future с экземпляром модели или None, если запись не найдена."""
+        future = self._futures.get(data_id)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._futures[data_id] = loop.create_future()
+        self._pending.append(data_id)
+        if len(self._pending) == 1:
+            loop.call_soon(self._schedule_dispatch)
+        return future
+
+    async def load_many(self, data_ids: list[int]) -> list:
+        """Загружает несколько записей, сохраняя порядок data_ids."""
+        return list(await asyncio.gather(*(self.load(data_id) for data_id in data_ids)))
+
+    def _schedule_dispatch(self) -> None:
+        data_ids, self._pending = self._pending, []
+        # Ссылка на задачу хранится до её завершения, иначе сборщик мусора может удалить её раньше
+        task = asyncio.create_task(self._dispatch(data_ids))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, data_ids: list[int]) -> None:
+        futures = [self._futures[data_id] for data_id in data_ids]
+        try:
+            async with self._lock:
+                instances = await self.dao.find_many_by_ids(data_ids)
+        except asyncio.CancelledError:
+            self._fail(data_ids, None)
+            raise
+        except Exception as e:
+            self._fail(data_ids, e)
+            return
+        for future, instance in zip(futures, instances):
+            if not future.done():
+                future.set_result(instance)
+
+    def _fail(self, data_ids: list[int], error: Exception | None) -> None:
+        """Завершает ожидающие future ошибкой error (или отменяет их, если error=None)."""
+        for data_id in data_ids:
+            # Ошибку не запоминаем, чтобы повторный load() выполнил запрос заново
+            future = self._futures.pop(data_id)
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
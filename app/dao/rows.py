@@ -0,0 +1,89 @@
+from decimal import Decimal
+from typing import Iterable
+
+from app.models import ApplicationStatus
+
+
+class ServiceRow:
+    """Услуга заявки для вывода: только поля, которые показывают шаблоны и коммерческое предложение."""
+
+    __slots__ = ('training_type', 'training_program', 'people_count', 'training_rank')
+
+    def __init__(self, training_type: str, training_program: str, people_count: int, training_rank: str | None):
+        self.training_type = training_type
+        self.training_program = training_program
+        self.people_count = people_count
+        self.training_rank = training_rank
+
+    def __getitem__(self, key: str):
+        # Шаблоны обращаются к полям как к ключам словаря: service['training_type']
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ApplicationRow:
+    """
+    Заявка с услугами для вывода. Поддерживает обращение к полям как к ключам словаря (application['id'],
+    application.get('company_name')), поэтому подходит шаблонам, написанным для словарей. Для сериализации
+    в JSON и для изменения данных (prepare_offer_data) используйте as_dict().
+    """
+
+    __slots__ = ('id', 'company_name', 'phone_number', 'email', 'status', 'offer_total', 'user_id', 'services')
+
+    def __init__(self, id: int, company_name: str, phone_number: str, email: str, status: int,
+                 offer_total: Decimal | None, user_id: int, services: list[ServiceRow]):
+        self.id = id
+        self.company_name = company_name
+        self.phone_number = phone_number
+        self.email = email
+        self.status = ApplicationStatus(status)
+        self.offer_total = offer_total
+        self.user_id = user_id
+        self.services = services
+
+    @property
+    def status_text(self) -> str:
+        return self.status.describe(self.offer_total)
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self) -> dict:
+        """Словарь в том же виде, в каком заявки отдавались до появления ApplicationRow."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['status_text'] = self.status_text
+        data['services'] = [service.as_dict() for service in self.services]
+        return data
+
+
+def build_application_rows(rows: Iterable[tuple]) -> list[ApplicationRow]:
+    """
+    Собирает заявки с услугами за один проход по строкам соединения заявок с услугами.
+
+    Строки: (id, company_name, phone_number, email, status, offer_total, user_id,
+    training_type, training_program, people_count, training_rank), строки одной заявки идут подряд.
+    У заявки без услуг поля услуги равны None (LEFT OUTER JOIN).
+    """
+    applications = []
+    current = None
+    for row in rows:
+        if current is None or current.id != row[0]:
+            current = ApplicationRow(*row[:7], [])
+            applications.append(current)
+        if row[7] is not None:
+            current.services.append(ServiceRow(*row[7:]))
+    return applications
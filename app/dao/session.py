@@ -0,0 +1,111 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+
+
+class UnitOfWork:
+    """
+    Единица работы: одна сессия и одна транзакция на HTTP запрос или на группу вызовов DAO.
+
+    Пока единица работы активна, методы DAO используют её сессию вместо открытия собственной,
+    а изменения фиксируются одним коммитом в конце блока. Транзакция не должна оставаться открытой
+    на время запросов к Telegram: обработчики бота открывают единицу работы только вокруг вызовов DAO
+    и отправляют сообщения после её фиксации (или откладывают отправку через after_commit).
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.callbacks: list[Callable[[], None]] = []
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Откладывает вызов callback до успешной фиксации транзакции."""
+        self.callbacks.append(callback)
+
+
+_current_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar('unit_of_work', default=None)
+
+
+def current_unit_of_work() -> UnitOfWork | None:
+    """Возвращает активную единицу работы или None."""
+    return _current_unit_of_work.get()
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """
+    Открывает единицу работы для текущего контекста. Вложенные вызовы присоединяются к уже открытой.
+
+    Транзакция фиксируется при выходе из блока и откатывается при исключении. Сессию единицы работы
+    нельзя использовать из нескольких задач одновременно, поэтому внутри неё вызовы DAO не запускают
+    через asyncio.gather.
+    """
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        yield uow
+        return
+    async with async_session_maker() as session:
+        uow = UnitOfWork(session)
+        token = _current_unit_of_work.set(uow)
+        try:
+            async with session.begin():
+                yield uow
+        finally:
+            _current_unit_of_work.reset(token)
+    for callback in uow.callbacks:
+        callback()
+
+
+async def get_unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """Зависимость FastAPI: открывает единицу работы на время обработки запроса."""
+    async with unit_of_work() as uow:
+        yield uow
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Вызывает callback после фиксации активной единицы работы, а без неё - сразу."""
+    uow = _current_unit_of_work.get()
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit(callback)
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """Сессия для чтения: сессия активной единицы работы или новая сессия."""
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        yield uow.session
+        return
+    async with async_session_maker() as session:
+        yield session
+
+
+@asynccontextmanager
+async def write_session() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для записи. Без единицы работы открывает новую сессию с транзакцией и фиксирует её при выходе,
+    внутри единицы работы только сбрасывает изменения в базу данных (flush), а коммит выполнит единица работы.
+    """
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        yield uow.session
+        await uow.session.flush()
+        return
+    async with async_session_maker() as session:
+        async with session.begin():
+            yield session
+
+
+@asynccontextmanager
+async def stream_session() -> AsyncIterator[AsyncSession]:
+    """
+    Отдельная сессия для потокового чтения. Не присоединяется к единице работы: потоковый ответ
+    перебирается уже после того, как единица работы запроса завершена.
+    """
+    async with async_session_maker() as session:
+        yield session
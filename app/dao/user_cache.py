@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+from app.config import settings
+from app.dao.cache_version import SharedCacheVersion
+from app.metrics import registry
+
+
+class KnownUserCache:
+    """
+    Ограниченный LRU кэш пользователей, уже сохранённых в базе данных: telegram_id -> (first_name, username).
+
+    Позволяет не обращаться к базе данных при повторной команде /start, если пользователь зарегистрирован
+    и его имя не изменилось. Кэш у каждого процесса свой, а пользователь попадает в него только после
+    фиксации транзакции, в которой он был сохранён (см. UserDAO.register). Удаление пользователей в другом
+    процессе обнаруживается по версии shared_version (revalidate) не позже чем через её ttl секунд.
+    """
+
+    def __init__(self, maxsize: int, shared_version: SharedCacheVersion):
+        self.maxsize = maxsize
+        self.shared_version = shared_version
+        self._users: OrderedDict[int, tuple[str, str | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def revalidate(self) -> None:
+        """Очищает кэш, если другой процесс удалял пользователей."""
+        if await self.shared_version.changed():
+            self.clear()
+
+    def is_known(self, telegram_id: int, profile: tuple[str, str | None]) -> bool:
+        """Проверяет, сохранён ли пользователь в базе данных именно с такими first_name и username."""
+        if self._users.get(telegram_id) == profile:
+            self._users.move_to_end(telegram_id)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def remember(self, telegram_id: int, profile: tuple[str, str | None]) -> None:
+        self._users[telegram_id] = profile
+        self._users.move_to_end(telegram_id)
+        if len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+known_users = KnownUserCache(maxsize=settings.KNOWN_USERS_CACHE_SIZE,
+                             shared_version=SharedCacheVersion('users', ttl=settings.CACHE_VERSION_TTL))
+
+registry.counter_callback('known_users_lookups_total', 'Обращения к кэшу зарегистрированных пользователей',
+                          ('result',), lambda: {('hit',): known_users.hits, ('miss',): known_users.misses})
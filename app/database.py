@@ -1,11 +1,54 @@
 from sqlalchemy import func
 from datetime import datetime
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession
 
-database_url = 'sqlite+aiosqlite:///db.sqlite3'
-engine = create_async_engine(database_url)
+from app.config import settings
+from app.metrics import registry
+from app.profiler import query_profiler
+
+database_url = settings.DATABASE_URL
+
+
+def get_engine_options(url: str) -> dict:
+    """Возвращает параметры create_async_engine для указанной базы данных с учётом настроек пула."""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        # Для SQLite драйвер сам выбирает пул (NullPool для файла, StaticPool для базы в памяти)
+        return {}
+    options = {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+    if url.get_driver_name() == 'asyncpg':
+        options['connect_args'] = {
+            'prepared_statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+            'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+engine = create_async_engine(database_url, **get_engine_options(database_url))
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+query_profiler.install(engine)
+
+
+def get_pool_status() -> dict[tuple, int]:
+    """
+    Состояние пула соединений для метрик (у NullPool SQLite состояния нет).
+    overflow, как и в SQLAlchemy, отрицателен, пока пул не заполнен до pool_size.
+    """
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return {}
+    return {('size',): pool.size(), ('checked_out',): pool.checkedout(),
+            ('checked_in',): pool.checkedin(), ('overflow',): pool.overflow()}
+
+
+registry.gauge_callback('db_pool_connections', 'Соединения пула базы данных', ('state',), get_pool_status)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -15,4 +58,3 @@ class Base(AsyncAttrs, DeclarativeBase):
     """
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
-
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Awaitable, Callable
+
+try:
+    import fcntl
+except ImportError:
+    # На Windows блокировки flock нет, там приложение запускается одним процессом
+    fcntl = None
+
+from app.config import settings
+
+
+def default_lock_path() -> str:
+    """Файл блокировки по умолчанию: общий для всех процессов одного бота на этом сервере."""
+    bot_id = settings.BOT_TOKEN.split(':', 1)[0]
+    return os.path.join(tempfile.gettempdir(), f'telegram_bot_{bot_id}.lock')
+
+
+class LeaderElection:
+    """
+    Выбор ведущего процесса среди воркеров uvicorn (--workers N) через блокировку файла (flock).
+
+    Ведущий процесс владеет жизненным циклом бота (установка вебхука, сообщения о запуске и остановке)
+    и фоновыми задачами (доставка outbox). Все процессы обслуживают HTTP и /webhook. Остальные процессы
+    раз в retry_interval секунд пробуют взять блокировку и заменяют ведущий процесс, если он завершился:
+    блокировку снимает операционная система при завершении процесса, в том числе аварийном.
+
+    Блокировка файла работает в пределах одного сервера, процессы на разных серверах её не разделяют.
+    """
+
+    def __init__(self, path: str, retry_interval: float):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd: int | None = None
+        self._task: asyncio.Task | None = None
+
+    def try_acquire(self) -> bool:
+        """Пробует стать ведущим, не дожидаясь освобождения блокировки."""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # PID ведущего процесса в файле нужен только для диагностики
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
+
+    async def start(self, on_elected: Callable[[], Awaitable[None]]) -> None:
+        """
+        Вызывает on_elected, как только процесс станет ведущим: сразу, если блокировка свободна,
+        иначе в фоновой задаче после её освобождения.
+        """
+        if self.try_acquire():
+            logging.info(f'Процесс {os.getpid()} ведущий, запускаю жизненный цикл бота и фоновые задачи')
+            await on_elected()
+            return
+        logging.info(f'Процесс {os.getpid()} ведомый: только обслуживает HTTP запросы и вебхук')
+        self._task = asyncio.create_task(self._wait(on_elected))
+
+    async def _wait(self, on_elected: Callable[[], Awaitable[None]]) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        logging.info(f'Процесс {os.getpid()} стал ведущим вместо завершившегося')
+        try:
+            await on_elected()
+        except Exception:
+            logging.exception('Ошибка при запуске задач ведущего процесса')
+
+    async def stop(self) -> None:
+        """Прекращает ожидание блокировки. Блокировку ведущий процесс снимает сам через release()."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+leader_election = LeaderElection(path=settings.LEADER_LOCK_FILE or default_lock_path(),
+                                 retry_interval=settings.LEADER_RETRY_INTERVAL)
@@ -1,46 +1,150 @@
+import time
+
+# Время начала импорта модулей приложения, для замера длительности запуска
+_import_started = time.perf_counter()
+
 import logging
 
 from contextlib import asynccontextmanager
-from aiogram.types import Update
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from pydantic import ValidationError
 
+from app.api.middlewares import HTTPMetricsMiddleware, SQLProfilerMiddleware
 from app.api.pages_router import router as pages_router
-from app.bot.create_bot import bot, dp, stop_bot, start_bot
+from app.bot.create_bot import bot, dp, stop_bot, start_bot, setup_webhook
 from app.bot.handlers.user_router import user_router
 from app.bot.handlers.admin_router import admin_router
+from app.bot.outbox import outbox_worker
+from app.bot.polling import update_poller
+from app.bot.update_queue import update_queue
+from app.bot.webhook import webhook_decoder
+from app.commercial_offer.renderer import offer_renderer
 from app.config import settings
+from app.leader import leader_election
+from app.metrics import registry
+from app.profiler import query_profiler
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Длительность этапов запуска в секундах: импорт модулей приложения и настройка в lifespan
+startup_durations = {'import': time.perf_counter() - _import_started}
+registry.gauge_callback('app_startup_seconds', 'Длительность запуска приложения по этапам', ('phase',),
+                        lambda: {(phase,): duration for phase, duration in startup_durations.items()})
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    setup_started = time.perf_counter()
     logging.info('Начинаю настройку бота')
     dp.include_router(user_router)
     dp.include_router(admin_router)
-    await start_bot()
-    webhook_url = settings.get_webhook_url()
-    await bot.set_webhook(url=webhook_url,
-                          allowed_updates=dp.resolve_used_update_types(),
-                          drop_pending_updates=True)
-    logging.info(f'Вебхук установлен в {webhook_url}')
+    used_update_types = dp.resolve_used_update_types()
+    webhook_decoder.set_used_update_types(used_update_types)
+    polling = settings.BOT_MODE == 'polling'
+    # При long polling обновления всегда обрабатываются через очередь
+    use_queue = settings.WEBHOOK_QUEUE or polling
+    if use_queue:
+        update_queue.start(bot, dp)
+    offer_renderer.start()
+
+    async def start_leader_tasks() -> None:
+        # Вебхук, сообщения администратору и доставка outbox нужны в одном экземпляре на все воркеры uvicorn
+        outbox_worker.start(bot)
+        await start_bot()
+        if polling:
+            # getUpdates не работает, пока установлен вебхук
+            await bot.delete_webhook(drop_pending_updates=settings.WEBHOOK_DROP_PENDING)
+            update_poller.start(bot, used_update_types)
+            logging.info('Вебхук удален, обновления запрашиваются через getUpdates')
+        elif await setup_webhook(used_update_types):
+            logging.info(f'Вебхук установлен в {settings.get_webhook_url()}')
+        else:
+            logging.info('Вебхук уже установлен, накопившиеся обновления будут доставлены')
+
+    await leader_election.start(start_leader_tasks)
+    startup_durations['setup'] = time.perf_counter() - setup_started
+    logging.info(f'Приложение запущено за {sum(startup_durations.values()):.2f} с (импорт модулей '
+                 f'{startup_durations["import"]:.2f} с, настройка {startup_durations["setup"]:.2f} с)')
     yield
     logging.info('Останавливаю бота')
-    await bot.delete_webhook()
-    await stop_bot()
-    logging.info('Вебхук удален')
+    await leader_election.stop()
+    # Сначала перестаём получать обновления, затем дожидаемся обработки уже полученных
+    await update_poller.stop()
+    if use_queue:
+        await update_queue.stop()
+    offer_renderer.stop()
+    if leader_election.is_leader:
+        if settings.WEBHOOK_DELETE_ON_SHUTDOWN and not polling:
+            await bot.delete_webhook()
+            logging.info('Вебхук удален')
+        await outbox_worker.stop()
+        await stop_bot()
+        leader_election.release()
 
 
 app = FastAPI(lifespan=lifespan)
 app.mount('/static', StaticFiles(directory='app/static'), 'static')
+app.add_middleware(HTTPMetricsMiddleware)
+if query_profiler.enabled:
+    app.add_middleware(SQLProfilerMiddleware)
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics() -> Response:
+    """Метрики приложения в текстовом формате Prometheus."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.get('/debug/sql', include_in_schema=False)
+async def sql_report(limit: int = 20, reset: bool = False) -> Response:
+    """Отчёт профилировщика SQL (доступен при SQL_PROFILER=True), reset=true очищает накопленную статистику."""
+    if not query_profiler.enabled:
+        return Response(status_code=404)
+    report = query_profiler.report(limit)
+    if reset:
+        query_profiler.reset()
+    return JSONResponse(report)
 
 
 @app.post('/webhook')
-async def webhook(request: Request):
+async def webhook(request: Request) -> Response:
     logging.info('Получен запрос на вебхук')
-    update = Update.model_validate(await request.json(), context={'bot': bot})
-    await dp.feed_update(bot, update)
-    logging.info('Обновление обработано')
+    if not webhook_decoder.check_secret(request.headers.get('X-Telegram-Bot-Api-Secret-Token')):
+        logging.warning('Запрос на вебхук с неверным секретным токеном')
+        return Response(status_code=401)
+    body = await request.body()
+    if webhook_decoder.is_unused(body):
+        logging.info('Обновление неиспользуемого типа пропущено')
+        return Response()
+    try:
+        update = webhook_decoder.decode(body, bot)
+    except ValidationError as e:
+        # Telegram повторяет доставку после любого ответа, кроме 2xx, поэтому некорректное обновление
+        # отбрасывается с ответом 200, иначе оно доставлялось бы снова и снова
+        logging.warning(f'Некорректное обновление пропущено: {e.error_count()} ошибок, {e.errors()[0]["msg"]}')
+        return Response()
+    if update_queue.is_duplicate(update.update_id):
+        logging.info(f'Повторная доставка обновления {update.update_id} пропущена')
+        return Response()
+    if not settings.WEBHOOK_QUEUE:
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            # Telegram повторит доставку после ошибки, повтор не должен быть отброшен как дубликат
+            update_queue.forget(update.update_id)
+            raise
+        logging.info('Обновление обработано')
+        return Response()
+    if not await update_queue.put(update):
+        # Telegram повторит доставку позже, поэтому обновление не должно считаться полученным
+        update_queue.forget(update.update_id)
+        logging.warning('Очередь обновлений переполнена')
+        return Response(status_code=503)
+    logging.info('Обновление поставлено в очередь')
+    return Response()
 
 app.include_router(pages_router)
\ No newline at end of file
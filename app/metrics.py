@@ -0,0 +1,190 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Границы гистограмм длительностей (в секундах), как у стандартных клиентов Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Базовый класс метрики с набором меток. Значения хранятся по кортежу значений меток."""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    """Гистограмма: количество наблюдений по границам buckets, их сумма и общее количество."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Измеряет длительность блока with."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+        return sum(counts)
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total[0])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class CallbackGauge(Metric):
+    """
+    Показатель, значение которого вычисляется при каждом чтении метрик.
+    collect возвращает словарь {кортеж значений меток: значение}.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...],
+                 collect: Callable[[], dict[tuple, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self.collect().items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class CallbackCounter(CallbackGauge):
+    """Счётчик, который ведёт сам объект приложения, а значение вычисляется при чтении метрик."""
+
+    type = 'counter'
+
+
+class Registry:
+    """Набор метрик приложения, отдаётся в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Метрика {metric.name} уже зарегистрирована')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: tuple[str, ...],
+                       collect: Callable[[], dict[tuple, float]]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, labelnames, collect))
+
+    def counter_callback(self, name: str, documentation: str, labelnames: tuple[str, ...],
+                         collect: Callable[[], dict[tuple, float]]) -> CallbackCounter:
+        return self.register(CallbackCounter(name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+registry = Registry()
+
+# Метрики подсистем приложения (значения пишут соответствующие модули)
+HTTP_REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Длительность обработки HTTP запросов', ('method', 'route', 'status'))
+HANDLER_DURATION = registry.histogram(
+    'aiogram_handler_duration_seconds', 'Длительность обработчиков aiogram', ('event', 'handler'))
+HANDLER_ERRORS = registry.counter(
+    'aiogram_handler_errors_total', 'Исключения в обработчиках aiogram', ('event', 'handler'))
+DAO_CALL_DURATION = registry.histogram(
+    'dao_call_duration_seconds', 'Длительность вызовов методов DAO', ('dao', 'method'))
+DAO_CALL_ERRORS = registry.counter(
+    'dao_call_errors_total', 'Исключения в методах DAO', ('dao', 'method'))
+TELEGRAM_REQUEST_DURATION = registry.histogram(
+    'telegram_api_request_duration_seconds', 'Длительность запросов к Telegram Bot API', ('method',))
+TELEGRAM_REQUESTS = registry.counter(
+    'telegram_api_requests_total', 'Запросы к Telegram Bot API по коду результата', ('method', 'code'))
+OFFER_RENDER_DURATION = registry.histogram(
+    'offer_render_duration_seconds', 'Длительность рендеринга коммерческих предложений', ('result',))
@@ -0,0 +1,46 @@
+"""
+Создание схемы новой базы данных (SQLite или PostgreSQL).
+
+Ранние ревизии рассчитаны на уже существующую базу SQLite и не воспроизводятся на пустой базе, а применённые
+ревизии не меняются. Поэтому новая база создаётся по моделям и отмечается последней ревизией, после чего
+обновляется обычным `alembic upgrade head`:
+
+    python -m app.migration.create_schema
+"""
+import asyncio
+import os
+
+import sqlalchemy as sa
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import Base, engine
+import app.models  # noqa: F401 - регистрирует таблицы в Base.metadata
+
+
+def get_script_directory() -> ScriptDirectory:
+    """Каталог ревизий Alembic независимо от текущего рабочего каталога."""
+    config = Config()
+    config.set_main_option('script_location', os.path.dirname(os.path.abspath(__file__)))
+    return ScriptDirectory.from_config(config)
+
+
+def _create_schema(connection: Connection) -> None:
+    tables = sa.inspect(connection).get_table_names()
+    if tables:
+        raise RuntimeError(f'База данных не пуста ({", ".join(sorted(tables))}), используйте alembic upgrade head')
+    Base.metadata.create_all(connection)
+    MigrationContext.configure(connection).stamp(get_script_directory(), 'head')
+
+
+async def create_schema(target: AsyncEngine = engine) -> None:
+    """Создаёт таблицы по моделям и отмечает базу последней ревизией в одной транзакции."""
+    async with target.begin() as connection:
+        await connection.run_sync(_create_schema)
+
+
+if __name__ == '__main__':
+    asyncio.run(create_schema())
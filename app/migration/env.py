@@ -7,7 +7,7 @@ import asyncio
 from logging.config import fileConfig
 
 from sqlalchemy import pool
-from sqlalchemy.engine import Connection
+from sqlalchemy.engine import Connection, make_url
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
@@ -18,7 +18,8 @@ from app.models import User, TrainingType, TrainingProgram, Application, Applica
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", database_url)
+# Знак % в URL (например, в пароле) нужно экранировать для ConfigParser
+config.set_main_option("sqlalchemy.url", database_url.replace('%', '%%'))
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 # Interpret the config file for Python logging.
@@ -32,6 +33,10 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# SQLite не поддерживает большинство ALTER TABLE, поэтому для неё autogenerate
+# формирует операции в batch режиме (пересоздание таблицы)
+render_as_batch = make_url(database_url).get_backend_name() == 'sqlite'
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -56,6 +61,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=render_as_batch,
     )
 
     with context.begin_transaction():
@@ -63,7 +69,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=render_as_batch)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,109 @@
+"""application status code
+
+Revision ID: 14b8779dcbf8
+Revises: b5cc52e4ee1d
+Create Date: 2026-10-18 16:20:45.164398
+
+"""
+import re
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '14b8779dcbf8'
+down_revision: Union[str, None] = 'b5cc52e4ee1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Значения ApplicationStatus на момент миграции
+STATUS_IN_WORK = 1
+STATUS_OFFER = 2
+
+applications = sa.table(
+    'applications',
+    sa.column('status', sa.String()),
+    sa.column('status_code', sa.SmallInteger()),
+    sa.column('offer_total', sa.Numeric(precision=12, scale=2)),
+)
+
+
+def parse_status(status: str) -> tuple[int, Decimal | None]:
+    """Разбирает текстовый статус вида 'В работе' или 'Предложение 12345.5'."""
+    if status.strip() == 'В работе':
+        return STATUS_IN_WORK, None
+    match = re.fullmatch(r'\s*Предложение\s+(\d+(?:[.,]\d+)?)\s*', status)
+    if match:
+        return STATUS_OFFER, Decimal(match.group(1).replace(',', '.')).quantize(Decimal('0.01'))
+    # Любой другой текст означает, что заявка уже отработана, но сумма неизвестна
+    return STATUS_OFFER, None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_code', sa.SmallInteger(), nullable=True))
+        batch_op.add_column(sa.Column('offer_total', sa.Numeric(precision=12, scale=2), nullable=True))
+
+    # Различных текстовых статусов немного, поэтому обновляем по одному запросу на значение
+    conn = op.get_bind()
+    for (status,) in conn.execute(sa.select(applications.c.status).distinct()).all():
+        status_code, offer_total = parse_status(status)
+        conn.execute(
+            applications.update()
+            .where(applications.c.status == status)
+            .values(status_code=status_code, offer_total=offer_total)
+        )
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_index('ix_applications_user_id_status')
+        batch_op.drop_index('ix_applications_status_id')
+        batch_op.drop_column('status')
+        batch_op.alter_column('status_code', new_column_name='status',
+                              existing_type=sa.SmallInteger(), nullable=False)
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index('ix_applications_user_id_status', ['user_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_index('ix_applications_user_id_status')
+        batch_op.drop_index('ix_applications_status_id')
+        batch_op.alter_column('status', new_column_name='status_code',
+                              existing_type=sa.SmallInteger(), existing_nullable=False)
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    conn.execute(
+        applications.update()
+        .where(applications.c.status_code == STATUS_IN_WORK)
+        .values(status='В работе')
+    )
+    # Сумма хранится с копейками, текстовый статус записываем без лишних нулей
+    offers = conn.execute(
+        sa.select(applications.c.offer_total).where(applications.c.status_code != STATUS_IN_WORK).distinct()
+    ).all()
+    for (offer_total,) in offers:
+        status = 'Предложение' if offer_total is None else f'Предложение {Decimal(offer_total).normalize():f}'
+        conn.execute(
+            applications.update()
+            .where(applications.c.status_code != STATUS_IN_WORK,
+                   applications.c.offer_total.is_(None) if offer_total is None
+                   else applications.c.offer_total == offer_total)
+            .values(status=status)
+        )
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_column('offer_total')
+        batch_op.drop_column('status_code')
+        batch_op.alter_column('status', existing_type=sa.String(), nullable=False)
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index('ix_applications_user_id_status', ['user_id', 'status'], unique=False)
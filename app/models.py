@@ -1,6 +1,9 @@
 import re
+from datetime import datetime, timezone
+from decimal import Decimal
+from enum import IntEnum
 
-from sqlalchemy import String, BigInteger, Integer, ForeignKey
+from sqlalchemy import String, BigInteger, Integer, SmallInteger, Numeric, ForeignKey, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from app.database import Base
 
@@ -21,12 +24,17 @@ from app.database import Base
 # ------------------------------------------------------------------------
 
 
+def utcnow() -> datetime:
+    """Текущее время UTC без часового пояса, в том же виде, в котором его хранит CURRENT_TIMESTAMP."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class User(Base):
     """Модель пользователя"""
     __tablename__ = 'users'
 
     # Уникальный идентификатор пользователя в Telegram
-    telegram_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
     # Имя пользователя
     first_name: Mapped[str] = mapped_column(String, nullable=False)
     # Telegram username
@@ -56,15 +64,35 @@ class TrainingProgram(Base):
     name: Mapped[str] = mapped_column(String, nullable=False)
 
     # Внешний ключ, ссылающийся на тип обучения
-    training_type_id: Mapped[int] = mapped_column(Integer, ForeignKey('training_types.id'), nullable=False)
+    training_type_id: Mapped[int] = mapped_column(Integer, ForeignKey('training_types.id'), nullable=False,
+                                                  index=True)
 
     # Связь с типом обучения (многие к одному)
     training_type: Mapped['TrainingType'] = relationship('TrainingType', back_populates='training_programs')
 
 
+class ApplicationStatus(IntEnum):
+    """Статус заявки, в базе данных хранится числом"""
+    # Заявка принята, коммерческое предложение ещё не подготовлено
+    IN_WORK = 1
+    # Клиенту отправлено коммерческое предложение
+    OFFER = 2
+
+    def describe(self, offer_total: Decimal | None = None) -> str:
+        """Текст статуса для отображения пользователю."""
+        if self is ApplicationStatus.OFFER:
+            return 'Предложение' if offer_total is None else f'Предложение {offer_total.normalize():f}'
+        return 'В работе'
+
+
 class Application(Base):
     """Модель заявки на коммерческое предложение"""
     __tablename__ = 'applications'
+    __table_args__ = (
+        # Заявки пользователя и заявки по статусу (keyset пагинация по id)
+        Index('ix_applications_user_id_status', 'user_id', 'status'),
+        Index('ix_applications_status_id', 'status', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -85,8 +113,10 @@ class Application(Base):
     services: Mapped[list['ApplicationService']] = relationship(back_populates='application',
                                                                 cascade='all, delete-orphan')
 
-    # Статус заявки
-    status: Mapped[str] = mapped_column(String, nullable=False)
+    # Статус заявки (значение ApplicationStatus)
+    status: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=ApplicationStatus.IN_WORK)
+    # Сумма коммерческого предложения, заполняется при переходе в статус OFFER
+    offer_total: Mapped[Decimal | None] = mapped_column(Numeric(12, 2), nullable=True)
 
     @validates('phone_number')
     def validate_phone_number(self, key, phone_number):
@@ -103,11 +133,11 @@ class ApplicationService(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     # Вид обучения (связь с моделью TrainingType)
-    training_type_id: Mapped[int] = mapped_column(ForeignKey('training_types.id'), nullable=False)
+    training_type_id: Mapped[int] = mapped_column(ForeignKey('training_types.id'), nullable=False, index=True)
     training_type: Mapped['TrainingType'] = relationship('TrainingType')
 
     # Программа обучения (связь с моделью TrainingProgram)
-    training_program_id: Mapped[int] = mapped_column(ForeignKey('training_programs.id'), nullable=False)
+    training_program_id: Mapped[int] = mapped_column(ForeignKey('training_programs.id'), nullable=False, index=True)
     training_program: Mapped['TrainingProgram'] = relationship('TrainingProgram')
 
     # Разряд обучения (опциональный)
@@ -117,5 +147,42 @@ class ApplicationService(Base):
     people_count: Mapped[int] = mapped_column(Integer, nullable=False)
 
     # Связь с заявкой
-    application_id: Mapped[int] = mapped_column(ForeignKey('applications.id'), nullable=False)
+    application_id: Mapped[int] = mapped_column(ForeignKey('applications.id'), nullable=False, index=True)
     application: Mapped['Application'] = relationship('Application', back_populates='services')
+
+
+class OutboxMessage(Base):
+    """Исходящее сообщение Telegram, записанное вместе с данными и ожидающее доставки (transactional outbox)"""
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        # Выборка недоставленных сообщений, время отправки которых наступило
+        Index('ix_outbox_messages_delivered_at_next_attempt_at', 'delivered_at', 'next_attempt_at'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    # Чат получателя
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Текст сообщения
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    # Клавиатура сообщения в JSON формате Bot API
+    reply_markup: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # Количество неудачных попыток отправки
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Время, не раньше которого нужно выполнить следующую попытку
+    next_attempt_at: Mapped[datetime] = mapped_column(nullable=False, default=utcnow)
+    # Время доставки, None - сообщение ещё не доставлено
+    delivered_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    # Текст последней ошибки отправки
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class CacheVersion(Base):
+    """Версия данных, которые процессы приложения кэшируют в памяти (см. app.dao.cache_version)"""
+    __tablename__ = 'cache_versions'
+
+    # Имя кэша, например catalog
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    # Увеличивается в транзакции каждой записи в данные кэша
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,200 @@
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+# Списки параметров IN (?, ?, ?) и IN ($1::INTEGER, $2::INTEGER) сворачиваются, чтобы запросы
+# с разным количеством id считались одним и тем же запросом
+_IN_LIST_RE = re.compile(r'IN \((?:\s*(?:\?|\$\d+(?:::[\w ]+)?|%\(\w+\)s)\s*,?)+\)')
+_PARAM_RE = re.compile(r'\$\d+(?:::[A-Z ]+)?')
+_SPACE_RE = re.compile(r'\s+')
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def statement_shape(statement: str) -> str:
+    """Приводит SQL запрос к виду, не зависящему от количества параметров и форматирования."""
+    shape = _SPACE_RE.sub(' ', statement).strip()
+    shape = _PARAM_RE.sub('?', shape)
+    return _IN_LIST_RE.sub('IN (...)', shape)
+
+
+class StatementStats:
+    """Накопленная статистика по одному виду запроса."""
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.call_sites: Counter[str] = Counter()
+        self.operations: Counter[str] = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "statement": self.shape,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "call_sites": dict(self.call_sites.most_common(5)),
+            "operations": dict(self.operations.most_common(5)),
+        }
+
+
+class RequestProfile:
+    """Запросы к базе данных, выполненные при обработке одного HTTP запроса или обновления Telegram."""
+
+    def __init__(self, get_operation: Callable[[], str]):
+        self.get_operation = get_operation
+        self.statements: Counter[str] = Counter()
+        self.total = 0.0
+
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar('sql_profile', default=None)
+_current_call_site: ContextVar[str | None] = ContextVar('sql_call_site', default=None)
+
+
+class QueryProfiler:
+    """
+    Профилировщик SQL на событиях движка SQLAlchemy.
+
+    Для каждого запроса запоминает длительность, место вызова (метод DAO и строку кода, из которой он вызван)
+    и операцию (маршрут FastAPI или обработчик aiogram). Медленные запросы пишутся в лог, а если за одну
+    операцию один и тот же запрос выполнен больше repeat_threshold раз, это отмечается как N+1.
+    """
+
+    def __init__(self, enabled: bool, slow_threshold: float, repeat_threshold: int,
+                 max_statements: int = 500, history: int = 50):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.max_statements = max_statements
+        self.statements: dict[str, StatementStats] = {}
+        self.slow_queries: deque[dict] = deque(maxlen=history)
+        self.repeated_queries: deque[dict] = deque(maxlen=history)
+        self.dropped = 0
+
+    def install(self, engine: AsyncEngine) -> None:
+        """Подписывается на события движка, если профилировщик включён."""
+        if not self.enabled:
+            return
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine.sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def request(self, operation: str | Callable[[], str]):
+        """
+        Контекст обработки одного запроса. operation - имя операции или функция, которая его возвращает
+        (маршрут FastAPI становится известен только после сопоставления запроса).
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._request(operation if callable(operation) else lambda: operation)
+
+    @contextmanager
+    def _request(self, get_operation: Callable[[], str]) -> Iterator[RequestProfile]:
+        profile = RequestProfile(get_operation)
+        token = _current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            _current_profile.reset(token)
+            self._check_repeats(profile)
+
+    def call_site(self, dao_method: str, frame) -> object:
+        """
+        Отмечает место вызова для запросов, выполненных внутри блока: метод DAO и вызвавшую его строку кода.
+        Вложенные вызовы DAO сохраняют внешнее место вызова.
+        """
+        if not self.enabled or _current_call_site.get() is not None:
+            return nullcontext()
+        return self._call_site(f'{dao_method} <- {self._describe_frame(frame)}')
+
+    @contextmanager
+    def _call_site(self, site: str) -> Iterator[None]:
+        token = _current_call_site.set(site)
+        try:
+            yield
+        finally:
+            _current_call_site.reset(token)
+
+    @staticmethod
+    def _describe_frame(frame) -> str:
+        if frame is None:
+            return 'unknown'
+        filename = os.path.relpath(frame.f_code.co_filename, os.path.dirname(_APP_DIR))
+        return f'{filename}:{frame.f_lineno} {frame.f_code.co_name}'
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context.profiler_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, 'profiler_started', None)
+        if started is not None:
+            self.record(statement, time.perf_counter() - started)
+
+    def record(self, statement: str, duration: float) -> None:
+        """Учитывает выполненный запрос."""
+        shape = statement_shape(statement)
+        profile = _current_profile.get()
+        operation = profile.get_operation() if profile else 'background'
+        call_site = _current_call_site.get() or 'unknown'
+        stats = self.statements.get(shape)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                self.dropped += 1
+            else:
+                stats = self.statements[shape] = StatementStats(shape)
+        if stats is not None:
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            stats.call_sites[call_site] += 1
+            stats.operations[operation] += 1
+        if profile is not None:
+            profile.statements[shape] += 1
+            profile.total += duration
+        if duration >= self.slow_threshold:
+            logging.warning(f'Медленный запрос {duration * 1000:.1f} мс ({operation}, {call_site}): {shape[:500]}')
+            self.slow_queries.append({"statement": shape, "duration_ms": round(duration * 1000, 3),
+                                      "operation": operation, "call_site": call_site})
+
+    def _check_repeats(self, profile: RequestProfile) -> None:
+        for shape, count in profile.statements.items():
+            if count > self.repeat_threshold:
+                operation = profile.get_operation()
+                logging.warning(f'Возможный N+1: {operation} выполнил один и тот же запрос {count} раз: {shape[:500]}')
+                self.repeated_queries.append({"operation": operation, "statement": shape, "count": count})
+
+    def report(self, limit: int = 20) -> dict:
+        """Сводка: самые затратные запросы, последние медленные запросы и случаи N+1."""
+        statements = sorted(self.statements.values(), key=lambda stats: stats.total, reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "repeat_threshold": self.repeat_threshold,
+            "statements": [stats.as_dict() for stats in statements[:limit]],
+            "slow_queries": list(self.slow_queries),
+            "repeated_queries": list(self.repeated_queries),
+            "dropped_statements": self.dropped,
+        }
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.slow_queries.clear()
+        self.repeated_queries.clear()
+        self.dropped = 0
+
+
+query_profiler = QueryProfiler(enabled=settings.SQL_PROFILER,
+                               slow_threshold=settings.SQL_SLOW_QUERY_MS / 1000,
+                               repeat_threshold=settings.SQL_REPEAT_THRESHOLD)
@@ -0,0 +1,99 @@
+"""
+Бенчмарк чтения списка заявок: прежний путь через объекты ORM и выборка нужных столбцов.
+
+Сравниваются:
+    * select(Application) с selectinload услуг и joinedload вида и программы обучения, unique()
+      и копирование объектов в словари (прежняя реализация ApplicationDAO.get_applications);
+    * ApplicationDAO.get_applications: один запрос по нужным столбцам и сборка ApplicationRow за один проход.
+
+Замеряются весь список заявок и одна страница. База заполняется как в benchmarks.dao_bench.
+
+Запуск из корня проекта (нужен .env или переменные окружения из README):
+    python -m benchmarks.applications_read --applications 10000
+"""
+import argparse
+import asyncio
+import shutil
+import statistics
+import time
+
+from benchmarks.dao_bench import check_empty_database, drop_database, seed_database, use_temporary_database
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Бенчмарк чтения списка заявок')
+    parser.add_argument('--applications', type=int, default=10000)
+    parser.add_argument('--services', type=int, default=3, help='услуг в одной заявке')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--database-url', help='пустая база данных вместо временной SQLite')
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> None:
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+
+    from app.dao.dao import ApplicationDAO
+    from app.dao.session import read_session
+    from app.models import Application, ApplicationService, ApplicationStatus
+
+    async def orm_applications(limit: int | None) -> list[dict]:
+        async with read_session() as session:
+            query = (
+                select(Application)
+                .options(selectinload(Application.services).joinedload(ApplicationService.training_type),
+                         selectinload(Application.services).joinedload(ApplicationService.training_program))
+                .order_by(Application.id.desc())
+                .limit(limit)
+            )
+            result = await session.execute(query)
+            return [{
+                "id": app.id,
+                "company_name": app.company_name,
+                "phone_number": app.phone_number,
+                "email": app.email,
+                "status": ApplicationStatus(app.status),
+                "status_text": ApplicationStatus(app.status).describe(app.offer_total),
+                "offer_total": app.offer_total,
+                "user_id": app.user_id,
+                "services": [{
+                    "training_type": service.training_type.name,
+                    "training_program": service.training_program.name,
+                    "people_count": service.people_count,
+                    "training_rank": service.training_rank,
+                } for service in app.services],
+            } for app in result.unique().scalars().all()]
+
+    async def row_applications(limit: int | None) -> list:
+        return await ApplicationDAO.get_applications(None, admin=True, limit=limit)
+
+    await check_empty_database()
+    data = await seed_database(args.applications, services_per_application=args.services)
+    print(f"Заявок {data['applications']}, услуг {data['services']}")
+    try:
+        old, new = await orm_applications(None), await row_applications(None)
+        assert [application.as_dict() for application in new] == old, 'Результаты двух путей различаются'
+        for name, limit in (('весь список', None), ('страница из 20', 20)):
+            timings = {}
+            for path, call in (('ORM и словари', orm_applications), ('столбцы и ApplicationRow', row_applications)):
+                await call(limit)
+                durations = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    await call(limit)
+                    durations.append(time.perf_counter() - started)
+                timings[path] = statistics.median(durations)
+                print(f'    {name:16} {path:26} {timings[path] * 1000:10.2f} мс')
+            old_time, new_time = timings.values()
+            print(f'    {name:16} ускорение в {old_time / new_time:.1f} раза')
+    finally:
+        await drop_database()
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    workdir = use_temporary_database(arguments.database_url)
+    try:
+        asyncio.run(main(arguments))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,292 @@
+"""
+Микро-бенчмарк методов DAO (app/dao/base.py, app/dao/dao.py) рядом с эквивалентными запросами SQLAlchemy Core.
+
+Для каждого размера данных скрипт создаёт схему во временной базе, заполняет её пользователями, заявками
+и услугами заявок, а затем измеряет find_all, find_one_or_none, add_many, update, count, exists
+и ApplicationDAO.get_applications. Рядом с каждым методом DAO (путь dao) измеряется тот же запрос
+через Core (путь core): select/insert().values()/update() по таблице без создания объектов ORM.
+
+Результат выводится таблицей и, с --json, сохраняется в файл. Этот файл можно передать как --baseline
+при следующем запуске: если медиана какого-либо замера стала медленнее базовой больше чем на --tolerance,
+скрипт завершается с кодом 1.
+
+По умолчанию используется временная база SQLite. База из --database-url должна быть пустой: скрипт
+создаёт в ней таблицы и удаляет их после замеров.
+
+Запуск из корня проекта (нужен .env или переменные окружения из README):
+    python -m benchmarks.dao_bench --sizes 1000,10000 --json dao_bench.json
+    python -m benchmarks.dao_bench --sizes 1000,10000 --baseline dao_bench.json --tolerance 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from typing import Awaitable, Callable
+
+# Размер пакета add_many и страницы get_applications
+BATCH_SIZE = 100
+PAGE_SIZE = 20
+TRAINING_TYPES = 5
+PROGRAMS_PER_TYPE = 10
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Бенчмарк методов DAO и запросов Core')
+    parser.add_argument('--sizes', default='1000,10000', help='количество заявок, через запятую')
+    parser.add_argument('--users-ratio', type=int, default=10, help='заявок на одного пользователя')
+    parser.add_argument('--services', type=int, default=3, help='услуг в одной заявке')
+    parser.add_argument('--repeat', type=int, default=20, help='замеров каждого вызова')
+    parser.add_argument('--database-url', help='пустая база данных вместо временной SQLite')
+    parser.add_argument('--json', help='сохранить результат в JSON файл')
+    parser.add_argument('--baseline', help='JSON файл прошлого запуска для проверки на регрессии')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое замедление медианы (0.25 = 25%%)')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def use_temporary_database(database_url: str | None) -> str:
+    """
+    Направляет приложение на базу данных для замеров. Вызывается до импорта модулей app: движок
+    создаётся при импорте app.database. Возвращает временный каталог, который нужно удалить после замеров.
+    """
+    workdir = tempfile.mkdtemp(prefix='dao_bench_')
+    os.environ['DATABASE_URL'] = database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'dao_bench.sqlite3')}"
+    return workdir
+
+
+async def check_empty_database() -> None:
+    """Прерывает замеры, если в базе данных уже есть таблицы приложения: замеры их пересоздают."""
+    from sqlalchemy import inspect
+
+    from app.database import Base, engine
+
+    async with engine.connect() as connection:
+        existing = await connection.run_sync(lambda sync: inspect(sync).get_table_names())
+    if set(existing) & set(Base.metadata.tables):
+        raise SystemExit(f'База данных не пуста (таблицы {sorted(set(existing) & set(Base.metadata.tables))}), '
+                         f'укажите пустую базу в --database-url')
+
+
+async def seed_database(applications_count: int, users_ratio: int = 10, services_per_application: int = 3,
+                        seed: int = 0) -> dict:
+    """Пересоздаёт схему и заполняет её пользователями, заявками и услугами заявок."""
+    from sqlalchemy import insert
+
+    from app.database import Base, engine
+    from app.models import Application, ApplicationService, ApplicationStatus, TrainingProgram, TrainingType, User
+
+    rnd = random.Random(seed)
+    users_count = max(1, applications_count // users_ratio)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    user_ids = [10 ** 6 + i for i in range(users_count)]
+    programs = [(type_id, (type_id - 1) * PROGRAMS_PER_TYPE + i + 1)
+                for type_id in range(1, TRAINING_TYPES + 1) for i in range(PROGRAMS_PER_TYPE)]
+    applications, services = [], []
+    for application_id in range(1, applications_count + 1):
+        status = rnd.choice(list(ApplicationStatus))
+        applications.append({
+            "id": application_id, "user_id": rnd.choice(user_ids), "company_name": f'ООО "Компания {application_id}"',
+            "phone_number": f"+79{rnd.randint(0, 10 ** 9 - 1):09d}", "email": f"mail{application_id}@example.com",
+            "status": status,
+            "offer_total": Decimal(rnd.randint(1000, 500000)) if status == ApplicationStatus.OFFER else None,
+        })
+        for type_id, program_id in rnd.sample(programs, services_per_application):
+            services.append({"application_id": application_id, "training_type_id": type_id,
+                             "training_program_id": program_id, "training_rank": rnd.choice([None, '2', '3']),
+                             "people_count": rnd.randint(1, 30)})
+    async with engine.begin() as connection:
+        await connection.execute(insert(TrainingType), [{"id": i, "name": f"Вид обучения {i}"}
+                                                        for i in range(1, TRAINING_TYPES + 1)])
+        await connection.execute(insert(TrainingProgram), [
+            {"id": program_id, "name": f"Программа {program_id}", "training_type_id": type_id}
+            for type_id, program_id in programs])
+        await connection.execute(insert(User), [{"telegram_id": user_id, "first_name": f"Пользователь {user_id}",
+                                                 "username": f"user{user_id}"} for user_id in user_ids])
+        await connection.execute(insert(Application), applications)
+        await connection.execute(insert(ApplicationService), services)
+    return {"users": users_count, "applications": applications_count, "services": len(services),
+            "user_ids": user_ids}
+
+
+async def drop_database() -> None:
+    """Удаляет таблицы, созданные для замеров, и закрывает соединения."""
+    from app.database import Base, engine
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def main(args: argparse.Namespace) -> dict:
+    # Модули приложения импортируются после выбора базы данных: движок создаётся при импорте app.database
+    import sqlalchemy
+    from sqlalchemy import exists, func, insert, select, update
+
+    from app.dao.dao import ApplicationDAO, UserDAO
+    from app.dao.session import read_session, write_session
+    from app.database import engine
+    from app.models import Application, ApplicationService, ApplicationStatus, TrainingProgram, TrainingType, User
+
+    users_table = User.__table__
+    applications_table = Application.__table__
+    services_table = ApplicationService.__table__
+
+    await check_empty_database()
+
+    async def core_read(query, fetch: Callable):
+        async with read_session() as session:
+            return fetch(await session.execute(query))
+
+    async def core_write(query, parameters=None):
+        async with write_session() as session:
+            return (await session.execute(query, parameters)).rowcount
+
+    applications_columns = (
+        select(applications_table.c.id, applications_table.c.company_name, applications_table.c.phone_number,
+               applications_table.c.email, applications_table.c.status, applications_table.c.offer_total,
+               applications_table.c.user_id, services_table.c.people_count, services_table.c.training_rank,
+               TrainingType.__table__.c.name, TrainingProgram.__table__.c.name)
+        .join(services_table, services_table.c.application_id == applications_table.c.id)
+        .join(TrainingType.__table__, TrainingType.__table__.c.id == services_table.c.training_type_id)
+        .join(TrainingProgram.__table__, TrainingProgram.__table__.c.id == services_table.c.training_program_id)
+    )
+
+    def cases(data: dict) -> dict[str, tuple[Callable[[int], Awaitable], Callable[[int], Awaitable]]]:
+        """Замеры: имя -> (вызов DAO, эквивалент на Core), оба принимают номер итерации."""
+        user_ids = data["user_ids"]
+        new_user_ids = iter(range(10 ** 9, 2 * 10 ** 9))
+
+        def user_id(i: int) -> int:
+            return user_ids[i * 7919 % len(user_ids)]
+
+        def new_users() -> list[dict]:
+            return [{"telegram_id": telegram_id, "first_name": "Новый", "username": None}
+                    for telegram_id in (next(new_user_ids) for _ in range(BATCH_SIZE))]
+
+        in_work = [ApplicationStatus.IN_WORK]
+        return {
+            'find_all': (
+                lambda i: UserDAO.find_all(),
+                lambda i: core_read(select(users_table), lambda result: result.all()),
+            ),
+            'find_one_or_none': (
+                lambda i: UserDAO.find_one_or_none(telegram_id=user_id(i)),
+                lambda i: core_read(select(users_table).where(users_table.c.telegram_id == user_id(i)),
+                                    lambda result: result.first()),
+            ),
+            'add_many': (
+                lambda i: UserDAO.add_many(new_users()),
+                lambda i: core_write(insert(users_table).values(new_users())),
+            ),
+            'update': (
+                lambda i: ApplicationDAO.update({'user_id': user_id(i)}, company_name=f'ООО "Обновлено {i}"'),
+                lambda i: core_write(update(applications_table).where(applications_table.c.user_id == user_id(i))
+                                     .values(company_name=f'ООО "Обновлено {i}"')),
+            ),
+            'count': (
+                lambda i: ApplicationDAO.count(user_id=user_id(i)),
+                lambda i: core_read(select(func.count()).select_from(applications_table)
+                                    .where(applications_table.c.user_id == user_id(i)),
+                                    lambda result: result.scalar()),
+            ),
+            'exists': (
+                lambda i: ApplicationDAO.exists(user_id=user_id(i)),
+                lambda i: core_read(select(exists().where(applications_table.c.user_id == user_id(i))),
+                                    lambda result: result.scalar()),
+            ),
+            'get_applications_page': (
+                lambda i: ApplicationDAO.get_applications(None, admin=True, in_work=True, limit=PAGE_SIZE),
+                lambda i: core_read(
+                    applications_columns.where(applications_table.c.id.in_(
+                        select(applications_table.c.id).where(applications_table.c.status.in_(in_work))
+                        .order_by(applications_table.c.id.desc()).limit(PAGE_SIZE).scalar_subquery()
+                    )).order_by(applications_table.c.id.desc()),
+                    lambda result: result.all()),
+            ),
+            'get_applications_all': (
+                lambda i: ApplicationDAO.get_applications(None, admin=True),
+                lambda i: core_read(applications_columns.order_by(applications_table.c.id.desc()),
+                                    lambda result: result.all()),
+            ),
+        }
+
+    async def measure(call: Callable[[int], Awaitable]) -> list[float]:
+        await call(-1)
+        durations = []
+        for i in range(args.repeat):
+            started = time.perf_counter()
+            await call(i)
+            durations.append(time.perf_counter() - started)
+        return durations
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        data = await seed_database(size, args.users_ratio, args.services, args.seed)
+        print(f"Заявок {data['applications']}, пользователей {data['users']}, услуг {data['services']}")
+        for name, calls in cases(data).items():
+            line = []
+            for path, call in zip(('dao', 'core'), calls):
+                durations = sorted(await measure(call))
+                result = {
+                    "size": size, "case": name, "path": path,
+                    "median_ms": round(statistics.median(durations) * 1000, 3),
+                    "min_ms": round(durations[0] * 1000, 3),
+                    "p95_ms": round(durations[max(0, round(len(durations) * 0.95) - 1)] * 1000, 3),
+                }
+                results.append(result)
+                line.append(f"{path} {result['median_ms']:9.3f} мс")
+            print(f"    {name:22} {'   '.join(line)}")
+    await drop_database()
+    return {
+        "meta": {
+            "database": engine.url.get_backend_name(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "repeat": args.repeat,
+            "users_ratio": args.users_ratio,
+            "services": args.services,
+        },
+        "results": results,
+    }
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Замеры, медиана которых медленнее базовой больше чем на tolerance."""
+    base = {(item["size"], item["case"], item["path"]): item for item in baseline["results"]}
+    regressions = []
+    for item in report["results"]:
+        previous = base.get((item["size"], item["case"], item["path"]))
+        if previous and item["median_ms"] > previous["median_ms"] * (1 + tolerance):
+            regressions.append(f"{item['case']} ({item['path']}, {item['size']} заявок): "
+                               f"{previous['median_ms']} -> {item['median_ms']} мс")
+    return regressions
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    workdir = use_temporary_database(arguments.database_url)
+    try:
+        bench_report = asyncio.run(main(arguments))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if arguments.json:
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(bench_report, file, ensure_ascii=False, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline, encoding='utf-8') as file:
+            found = find_regressions(bench_report, json.load(file), arguments.tolerance)
+        if found:
+            print('Регрессии относительно базового запуска:')
+            print('\n'.join(f'    {line}' for line in found))
+            sys.exit(1)
+        print('Регрессий относительно базового запуска нет')
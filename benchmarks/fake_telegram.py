@@ -0,0 +1,199 @@
+"""
+Локальная имитация Telegram Bot API для нагрузочных тестов без доступа к api.telegram.org.
+
+Сервер отвечает на запросы вида /bot<token>/<method> так, чтобы их разобрал aiogram: sendMessage и
+sendDocument возвращают сообщение, setWebhook/getWebhookInfo запоминают и отдают адрес вебхука, getUpdates
+отдаёт обновления, добавленные через push_update (long polling с учётом offset и timeout), прочие
+методы возвращают True. Задержка ответа и доля ответов 429 Too Many Requests настраиваются, статистика
+запросов по методам доступна по адресу /stats.
+
+Приложение направляется на имитацию переменной окружения TELEGRAM_API_URL. Отдельный запуск:
+    python -m benchmarks.fake_telegram --port 8081 --latency 50 --jitter 20 --rate-limit 0.05
+    TELEGRAM_API_URL=http://127.0.0.1:8081 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+# Методы, на которые имитация никогда не отвечает 429: без них приложение не запустится
+SERVICE_METHODS = {'getMe', 'setWebhook', 'deleteWebhook', 'getWebhookInfo', 'getUpdates'}
+MESSAGE_METHODS = {'sendMessage', 'sendDocument', 'sendPhoto', 'editMessageText', 'copyMessage'}
+
+
+class FakeTelegramServer:
+    """
+    Имитация Bot API. latency и jitter - задержка ответа и её случайный разброс (в секундах),
+    rate_limit - доля запросов (от 0 до 1), на которые отвечает 429 с retry_after секунд.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0.0,
+                 retry_after: int = 1, seed: int | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        # Чаты, которым отправлено хотя бы одно сообщение: по ним нагрузочный тест узнаёт об обработке обновлений
+        self.chats: set[int] = set()
+        self.messages_by_chat: Counter[int] = Counter()
+        self.webhook_url = ''
+        self.allowed_updates: list[str] = []
+        # Обновления для getUpdates, ещё не подтверждённые через offset
+        self.updates: deque[dict] = deque()
+        self._updates_added = asyncio.Event()
+        self.message_id = 0
+        self.started = time.monotonic()
+        self._runner: web.AppRunner | None = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_get('/stats', self.handle_stats)
+        app.router.add_route('*', '/bot{token}/{method}', self.handle_method)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8081) -> None:
+        """Запускает сервер в текущем цикле событий."""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self) -> None:
+        # Завершаем ожидающие запросы getUpdates, чтобы остановка сервера их не ждала
+        self._updates_added.set()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.requests[method] += 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if method not in SERVICE_METHODS and self.random.random() < self.rate_limit:
+            self.rate_limited[method] += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        params = await self._read_params(request)
+        if method == 'getUpdates':
+            return web.json_response({"ok": True, "result": await self.get_updates(params)})
+        return web.json_response({"ok": True, "result": self.result(method, request.match_info['token'], params)})
+
+    def push_update(self, update: dict) -> None:
+        """Добавляет обновление, которое бот получит через getUpdates."""
+        self.updates.append(update)
+        self._updates_added.set()
+
+    async def get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+        # Как в Bot API: offset подтверждает все обновления с меньшим update_id
+        while self.updates and self.updates[0]['update_id'] < offset:
+            self.updates.popleft()
+        if not self.updates and timeout > 0:
+            self._updates_added.clear()
+            try:
+                await asyncio.wait_for(self._updates_added.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return [self.updates[i] for i in range(min(limit, len(self.updates)))]
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> dict:
+        if request.content_type == 'application/json':
+            return await request.json()
+        # aiogram передаёт параметры как multipart/form-data, файлы приходят объектами FileField
+        return {key: value for key, value in (await request.post()).items() if isinstance(value, str)}
+
+    def result(self, method: str, token: str, params: dict):
+        if method == 'getMe':
+            return {"id": int(token.split(':')[0]), "is_bot": True, "first_name": "Нагрузочный тест",
+                    "username": "load_test_bot"}
+        if method == 'setWebhook':
+            self.webhook_url = params.get('url', '')
+            allowed_updates = params.get('allowed_updates') or []
+            # В multipart/form-data списки передаются строкой JSON
+            self.allowed_updates = json.loads(allowed_updates) if isinstance(allowed_updates, str) else allowed_updates
+            return True
+        if method == 'deleteWebhook':
+            self.webhook_url = ''
+            self.allowed_updates = []
+            return True
+        if method == 'getWebhookInfo':
+            return {"url": self.webhook_url, "has_custom_certificate": False, "pending_update_count": len(self.updates),
+                    "allowed_updates": self.allowed_updates}
+        if method in MESSAGE_METHODS:
+            return self._message(method, params)
+        return True
+
+    def _message(self, method: str, params: dict) -> dict:
+        self.message_id += 1
+        chat_id = int(params.get('chat_id', 0))
+        self.chats.add(chat_id)
+        self.messages_by_chat[chat_id] += 1
+        message = {"message_id": self.message_id, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}}
+        if method == 'sendDocument':
+            file_id = f'document-{self.message_id}'
+            message["document"] = {"file_id": file_id, "file_unique_id": file_id}
+            if params.get('caption'):
+                message["caption"] = params['caption']
+        elif params.get('text'):
+            message["text"] = params['text']
+        return message
+
+    def stats(self) -> dict:
+        return {
+            "uptime": round(time.monotonic() - self.started, 3),
+            "requests": dict(self.requests),
+            "rate_limited": dict(self.rate_limited),
+            "chats": len(self.chats),
+            "webhook_url": self.webhook_url,
+            "pending_updates": len(self.updates),
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Имитация Telegram Bot API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0, help='задержка ответа, мс')
+    parser.add_argument('--jitter', type=float, default=0, help='случайная добавка к задержке, мс')
+    parser.add_argument('--rate-limit', type=float, default=0, help='доля ответов 429 (от 0 до 1)')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after в ответах 429, с')
+    parser.add_argument('--seed', type=int, default=None)
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    server = FakeTelegramServer(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit,
+                                retry_after=args.retry_after, seed=args.seed)
+    await server.start(args.host, args.port)
+    print(f'Имитация Bot API: http://{args.host}:{args.port}, статистика: /stats')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(json.dumps(server.stats(), ensure_ascii=False, indent=2))
+        await server.stop()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,329 @@
+"""
+Нагрузочный тест вебхука и приёма заявок без доступа к api.telegram.org.
+
+Скрипт поднимает имитацию Bot API (benchmarks.fake_telegram) и прогоняет два сценария:
+    * webhook - POST /webhook с обновлениями /start от новых пользователей; после него скрипт ждёт, пока бот
+      ответит каждому пользователю, и считает сквозную пропускную способность обработки обновлений;
+    * submit - POST /submit_application от зарегистрированных пользователей с 1-3 услугами из справочника.
+
+С --mode polling приложение запускается с BOT_MODE=polling, и те же обновления /start вместо POST /webhook
+отдаются боту имитацией через getUpdates (сценарий polling), что позволяет сравнить пропускную способность
+обработки обновлений в двух режимах.
+
+Для каждого сценария выводятся количество запросов, ошибки, запросов в секунду и перцентили задержки.
+
+По умолчанию приложение запускается через uvicorn на копии db.sqlite3 во временном каталоге и направляется
+на имитацию через TELEGRAM_API_URL. Чтобы нагрузить уже запущенное приложение, передайте --url, а само
+приложение запустите с TELEGRAM_API_URL=http://127.0.0.1:<--telegram-port> (заявки сохранятся в его базу).
+
+Запуск из корня проекта:
+    python -m benchmarks.load_test --updates 500 --submits 200 --concurrency 20 --latency 30 --rate-limit 0.02
+    python -m benchmarks.load_test --mode polling --updates 500 --submits 0 --latency 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --json result.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+import aiohttp
+
+from benchmarks.fake_telegram import FakeTelegramServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOT_TOKEN = '123456:load-test'
+WEBHOOK_SECRET = 'load-test-secret'
+ADMIN_ID = 1
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class ScenarioResult:
+    """Задержки и коды ответов одного сценария."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: list[float] = []
+        self.statuses: Counter[str] = Counter()
+        self.elapsed = 0.0
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        errors = sum(count for status, count in self.statuses.items() if not status.startswith('2'))
+        return {
+            "scenario": self.name,
+            "requests": len(latencies),
+            "errors": errors,
+            "statuses": dict(self.statuses),
+            "elapsed_s": round(self.elapsed, 3),
+            "rps": round(len(latencies) / self.elapsed, 1) if self.elapsed else 0.0,
+            "latency_ms": {
+                name: round(percentile(latencies, fraction) * 1000, 2)
+                for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+            },
+        }
+
+
+async def run_scenario(name: str, total: int, concurrency: int,
+                       send: Callable[[int], Awaitable[int]]) -> ScenarioResult:
+    """Выполняет send(i) для i от 0 до total - 1 в concurrency параллельных потоков."""
+    result = ScenarioResult(name)
+    indexes = iter(range(total))
+
+    async def worker() -> None:
+        for i in indexes:
+            started = time.perf_counter()
+            try:
+                status = str(await send(i))
+            except aiohttp.ClientError as e:
+                status = type(e).__name__
+            result.latencies.append(time.perf_counter() - started)
+            result.statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def start_update(update_id: int, user_id: int) -> dict:
+    """Обновление с командой /start от нового пользователя, как его присылает Telegram."""
+    user = {"id": user_id, "is_bot": False, "first_name": f"Тест{user_id % 100000}",
+            "username": f"load_{user_id}", "language_code": "ru"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": 1,
+            "from": user,
+            "chat": {"id": user_id, "first_name": user["first_name"], "username": user["username"], "type": "private"},
+            "date": int(time.time()),
+            "text": "/start",
+            "entities": [{"offset": 0, "length": 6, "type": "bot_command"}],
+        },
+    }
+
+
+def application_payload(user_id: int, programs: list[tuple[int, int]], rnd: random.Random) -> dict:
+    """Заявка в том виде, в каком её отправляет форма мини-приложения (static/js/issue.js)."""
+    services = [{
+        "training_type_id": str(type_id),
+        "training_program_id": str(program_id),
+        "training_rank": rnd.choice(['', '2', '3', '4']),
+        "people_count": str(rnd.randint(1, 30)),
+    } for type_id, program_id in rnd.sample(programs, k=min(len(programs), rnd.randint(1, 3)))]
+    return {
+        "user_id": str(user_id),
+        "user_name": f"Тест{user_id % 100000}",
+        "company_name": f'ООО "Нагрузка {user_id % 100000}"',
+        "phone_number": f"+79{rnd.randint(0, 10 ** 9 - 1):09d}",
+        "email": f"load_{user_id}@example.com",
+        "services": services,
+    }
+
+
+async def load_programs(http: aiohttp.ClientSession, url: str) -> list[tuple[int, int]]:
+    """Пары (вид обучения, программа) из справочника приложения."""
+    async with http.get(f'{url}/get_training_types') as response:
+        types = (await response.json())['types']
+    programs = []
+    for training_type in types:
+        async with http.get(f'{url}/get_programs', params={'type_id': training_type['id']}) as response:
+            programs.extend((training_type['id'], item['id']) for item in (await response.json())['programs'])
+    return programs
+
+
+async def wait_for_chats(fake: FakeTelegramServer, user_ids: list[int], timeout: float) -> tuple[int, float]:
+    """
+    Ждёт, пока бот отправит сообщение каждому пользователю, но не дольше timeout.
+    Возвращает количество пользователей, получивших ответ, и время ожидания.
+    """
+    started = time.perf_counter()
+    pending = set(user_ids)
+    while pending and time.perf_counter() - started < timeout:
+        await asyncio.sleep(0.05)
+        pending -= fake.chats
+    return len(user_ids) - len(pending), time.perf_counter() - started
+
+
+async def run_load(args: argparse.Namespace, fake: FakeTelegramServer, url: str, secret: str | None) -> dict:
+    rnd = random.Random(args.seed)
+    # Новые telegram_id при каждом запуске, чтобы /start регистрировал пользователей и в заполненной базе
+    user_base = 10 ** 12 + int(time.time()) % 10 ** 6 * 10 ** 5
+    update_base = int(time.time() * 1000) % 10 ** 9
+    user_ids = [user_base + i for i in range(args.updates)]
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    results = {}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        async def send_update(i: int) -> int:
+            async with http.post(f'{url}/webhook', json=start_update(update_base + i, user_ids[i]),
+                                 headers=headers) as response:
+                await response.read()
+                return response.status
+
+        async def push_update(i: int) -> int:
+            fake.push_update(start_update(update_base + i, user_ids[i]))
+            return 200
+
+        if args.mode == 'polling':
+            updates = await run_scenario('polling', args.updates, 1, push_update)
+        else:
+            updates = await run_scenario('webhook', args.updates, args.concurrency, send_update)
+        report = results[updates.name] = updates.report()
+        processed, waited = await wait_for_chats(fake, user_ids, args.drain_timeout)
+        report['processed'] = processed
+        report['processed_s'] = round(updates.elapsed + waited, 3)
+        report['processed_per_s'] = round(processed / (updates.elapsed + waited), 1)
+
+        if args.submits:
+            programs = await load_programs(http, url)
+            registered = [user_id for user_id in user_ids if user_id in fake.chats]
+            if not programs or not registered:
+                raise SystemExit('Для сценария submit нужны программы обучения в базе и обработанные /start')
+
+            async def send_application(i: int) -> int:
+                payload = application_payload(registered[i % len(registered)], programs, rnd)
+                async with http.post(f'{url}/submit_application', json=payload) as response:
+                    await response.read()
+                    return response.status
+
+            results['submit'] = (await run_scenario('submit', args.submits, args.concurrency,
+                                                    send_application)).report()
+    results['telegram'] = fake.stats()
+    return results
+
+
+def start_app(args: argparse.Namespace, workdir: str, **extra_env: str) -> tuple[subprocess.Popen, str]:
+    """
+    Запускает приложение через uvicorn (args.workers процессов) на копии базы данных.
+    extra_env - дополнительные переменные окружения приложения.
+    """
+    database_url = args.database_url
+    if database_url is None:
+        shutil.copy(os.path.join(ROOT_DIR, 'db.sqlite3'), os.path.join(workdir, 'db.sqlite3'))
+        database_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'db.sqlite3')}"
+    url = f'http://127.0.0.1:{args.app_port}'
+    env = dict(os.environ, BOT_TOKEN=BOT_TOKEN, BASE_SITE=url, ADMIN_ID=str(ADMIN_ID), WEBHOOK_SECRET=WEBHOOK_SECRET,
+               DATABASE_URL=database_url, TELEGRAM_API_URL=f'http://127.0.0.1:{args.telegram_port}',
+               LEADER_LOCK_FILE=os.path.join(workdir, 'leader.lock'), **extra_env)
+    subprocess.run([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=ROOT_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    log = open(os.path.join(workdir, 'app.log'), 'wb')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(args.app_port),
+         '--workers', str(args.workers), '--no-access-log'],
+        cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, url
+
+
+async def wait_for_webhook(fake: FakeTelegramServer, process: subprocess.Popen, timeout: float,
+                           polling: bool = False) -> None:
+    """Ждёт, пока приложение установит вебхук (при polling - начнёт запрашивать getUpdates)."""
+    started = time.monotonic()
+    while not (fake.requests['getUpdates'] if polling else fake.webhook_url):
+        if process.poll() is not None:
+            raise SystemExit(f'Приложение завершилось с кодом {process.returncode}')
+        if time.monotonic() - started > timeout:
+            raise SystemExit('Приложение не начало получать обновления за отведённое время')
+        await asyncio.sleep(0.1)
+
+
+async def stop_app(process: subprocess.Popen, timeout: float = 30) -> None:
+    """Останавливает приложение. Ожидание не блокирует цикл событий: при остановке бот обращается к имитации."""
+    process.terminate()
+    started = time.monotonic()
+    while process.poll() is None:
+        if time.monotonic() - started > timeout:
+            process.kill()
+            break
+        await asyncio.sleep(0.1)
+
+
+async def main(args: argparse.Namespace) -> dict:
+    fake = FakeTelegramServer(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit,
+                              retry_after=args.retry_after, seed=args.seed)
+    await fake.start('127.0.0.1', args.telegram_port)
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    process = None
+    try:
+        if args.url:
+            url, secret = args.url.rstrip('/'), args.secret
+        else:
+            process, url = start_app(args, workdir, BOT_MODE=args.mode)
+            await wait_for_webhook(fake, process, args.startup_timeout, polling=args.mode == 'polling')
+            secret = WEBHOOK_SECRET
+        return await run_load(args, fake, url, secret)
+    finally:
+        if process is not None:
+            await stop_app(process)
+        await fake.stop()
+        if args.keep_workdir:
+            print(f'Рабочий каталог (база данных и лог приложения): {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Нагрузочный тест вебхука и приёма заявок')
+    parser.add_argument('--url', help='адрес запущенного приложения (по умолчанию приложение запускается само)')
+    parser.add_argument('--mode', choices=('webhook', 'polling'), default='webhook',
+                        help='способ получения обновлений приложением (BOT_MODE)')
+    parser.add_argument('--secret', help='WEBHOOK_SECRET запущенного приложения')
+    parser.add_argument('--database-url', help='база данных для запускаемого приложения (по умолчанию копия db.sqlite3)')
+    parser.add_argument('--app-port', type=int, default=8100)
+    parser.add_argument('--workers', type=int, default=1, help='процессов uvicorn запускаемого приложения')
+    parser.add_argument('--telegram-port', type=int, default=8081)
+    parser.add_argument('--updates', type=int, default=300, help='количество обновлений /start')
+    parser.add_argument('--submits', type=int, default=100, help='количество заявок')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0, help='задержка ответов Bot API, мс')
+    parser.add_argument('--jitter', type=float, default=0, help='случайная добавка к задержке Bot API, мс')
+    parser.add_argument('--rate-limit', type=float, default=0, help='доля ответов 429 от Bot API (от 0 до 1)')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after в ответах 429, с')
+    parser.add_argument('--drain-timeout', type=float, default=60, help='сколько ждать обработки всех /start, с')
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', help='сохранить результат в JSON файл')
+    parser.add_argument('--keep-workdir', action='store_true', help='не удалять базу данных и лог приложения')
+    return parser.parse_args()
+
+
+def print_report(results: dict) -> None:
+    for name in ('webhook', 'polling', 'submit'):
+        report = results.get(name)
+        if report is None:
+            continue
+        latency = report['latency_ms']
+        print(f"{name:8} {report['requests']:6} запросов  {report['errors']:4} ошибок  {report['rps']:8.1f} запр/с  "
+              f"p50 {latency['p50']:7.2f}  p95 {latency['p95']:7.2f}  p99 {latency['p99']:7.2f}  "
+              f"max {latency['max']:7.2f} мс")
+        if report['statuses'] and report['errors']:
+            print(f"         коды ответов: {report['statuses']}")
+    updates = results.get('webhook') or results.get('polling')
+    if updates:
+        print(f"Обработка /start: {updates['processed']} из {updates['requests']} за {updates['processed_s']} с, "
+              f"{updates['processed_per_s']} обновлений/с (до ответа бота пользователю)")
+    telegram = results['telegram']
+    print(f"Bot API: {telegram['requests']}, ответов 429: {telegram['rate_limited']}")
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    load_results = asyncio.run(main(arguments))
+    print_report(load_results)
+    if arguments.json:
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(load_results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,183 @@
+"""
+Проверка запуска приложения несколькими воркерами uvicorn (--workers N) с одним ведущим процессом.
+
+Скрипт поднимает имитацию Bot API (benchmarks.fake_telegram), запускает приложение в несколько процессов
+на копии db.sqlite3 и проверяет, что:
+    * вебхук проверяется и устанавливается один раз, а администратор получает одно сообщение о запуске;
+    * обновления /start, отправленные на /webhook, обрабатываются;
+    * вид обучения, добавленный в базу данных другим процессом, появляется в справочнике всех воркеров
+      не позже чем через CACHE_VERSION_TTL;
+    * после аварийного завершения ведущего процесса его место занимает другой процесс, а вебхук не удаляется;
+    * при остановке вебхук не удаляется и администратор получает одно сообщение об остановке.
+
+При нарушении любого из условий скрипт завершается с кодом 1. Та же проверка выполняется тестом
+tests/test_multi_worker.py.
+
+Запуск из корня проекта:
+    python -m benchmarks.multi_worker --workers 3
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+import aiohttp
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.fake_telegram import FakeTelegramServer
+from benchmarks.load_test import ADMIN_ID, WEBHOOK_SECRET, start_app, start_update, stop_app, wait_for_webhook
+
+# Как часто воркеры сверяют версию кэша справочника с базой данных, с
+CACHE_VERSION_TTL = 1
+
+
+def read_leader_pid(lock_path: str) -> int | None:
+    try:
+        with open(lock_path) as file:
+            return int(file.read().strip() or 0) or None
+    except FileNotFoundError:
+        return None
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+async def wait_until(condition, timeout: float) -> bool:
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            return False
+        await asyncio.sleep(0.1)
+    return True
+
+
+async def send_starts(url: str, user_ids: list[int]) -> list[int]:
+    async with aiohttp.ClientSession() as http:
+        async def send(user_id: int) -> int:
+            async with http.post(f'{url}/webhook', json=start_update(user_id % 10 ** 9, user_id),
+                                 headers={'X-Telegram-Bot-Api-Secret-Token': WEBHOOK_SECRET}) as response:
+                return response.status
+
+        return list(await asyncio.gather(*(send(user_id) for user_id in user_ids)))
+
+
+async def add_training_type(database_url: str, name: str) -> None:
+    """Добавляет вид обучения из другого процесса так же, как TrainingTypeDAO.add: вместе с версией справочника."""
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text('INSERT INTO training_types (name) VALUES (:name)'), {'name': name})
+            await conn.execute(text("INSERT INTO cache_versions (name, version) VALUES ('catalog', 1) "
+                                    "ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1"))
+    finally:
+        await engine.dispose()
+
+
+async def fetch_catalogs(url: str, requests: int) -> list[str]:
+    """
+    Запрашивает справочник requests раз. Каждый запрос идёт в новом соединении, поэтому запросы
+    распределяются между воркерами.
+    """
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True)) as http:
+        async def fetch() -> str:
+            async with http.get(f'{url}/get_training_types') as response:
+                return await response.text()
+
+        return list(await asyncio.gather(*(fetch() for _ in range(requests))))
+
+
+async def wait_for_catalog(url: str, name: str, requests: int, timeout: float) -> bool:
+    """Ждёт, пока name не окажется во всех ответах очередной серии из requests запросов справочника."""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if all(name in body for body in await fetch_catalogs(url, requests)):
+            return True
+        await asyncio.sleep(0.2)
+    return False
+
+
+async def main(args: argparse.Namespace) -> int:
+    fake = FakeTelegramServer()
+    await fake.start('127.0.0.1', args.telegram_port)
+    workdir = tempfile.mkdtemp(prefix='multi_worker_')
+    lock_path = os.path.join(workdir, 'leader.lock')
+    failures = []
+
+    def check(ok: bool, description: str) -> None:
+        print(f'{"OK  " if ok else "FAIL"} {description}')
+        if not ok:
+            failures.append(description)
+
+    database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'db.sqlite3')}"
+    process, url = start_app(args, workdir, LEADER_RETRY_INTERVAL='0.5', OFFER_RENDER_WORKERS='0',
+                             CACHE_VERSION_TTL=str(CACHE_VERSION_TTL))
+    try:
+        await wait_for_webhook(fake, process, args.startup_timeout)
+        # Ждём, пока запустятся все воркеры: ведомые процессы обращаются к Bot API только при обработке обновлений
+        await asyncio.sleep(args.settle)
+        check(fake.requests['setWebhook'] == 1, f"вебхук установлен один раз ({fake.requests['setWebhook']})")
+        check(fake.requests['getWebhookInfo'] == 1,
+              f"getWebhookInfo вызван одним процессом ({fake.requests['getWebhookInfo']})")
+        check(await wait_until(lambda: fake.messages_by_chat[ADMIN_ID] >= 1, 10)
+              and fake.messages_by_chat[ADMIN_ID] == 1,
+              f'одно сообщение администратору о запуске ({fake.messages_by_chat[ADMIN_ID]})')
+
+        user_ids = [10 ** 12 + int(time.time()) % 10 ** 6 * 10 ** 5 + i for i in range(args.updates)]
+        statuses = await send_starts(url, user_ids)
+        check(all(status == 200 for status in statuses), f'все запросы /webhook приняты ({set(statuses)})')
+        check(await wait_until(lambda: set(user_ids) <= fake.chats, 30), f'все {args.updates} обновлений /start обработаны')
+
+        # Справочник кэшируется в памяти каждого воркера, поэтому сначала он загружается во всех воркерах
+        await fetch_catalogs(url, args.workers * 10)
+        training_type = f'Вид обучения {int(time.time())}'
+        await add_training_type(database_url, training_type)
+        check(await wait_for_catalog(url, training_type, args.workers * 10, CACHE_VERSION_TTL + 10),
+              'новый вид обучения появился в справочнике всех воркеров')
+
+        leader_pid = read_leader_pid(lock_path)
+        check(leader_pid is not None and leader_pid != process.pid, f'ведущий процесс - воркер {leader_pid}')
+        if leader_pid:
+            os.kill(leader_pid, signal.SIGKILL)
+            check(await wait_until(lambda: (read_leader_pid(lock_path) or leader_pid) != leader_pid
+                                   and is_alive(read_leader_pid(lock_path)), 15),
+                  f'после завершения {leader_pid} ведущим стал процесс {read_leader_pid(lock_path)}')
+            check(fake.webhook_url != '' and fake.requests['setWebhook'] == 1,
+                  'новый ведущий процесс не переустанавливал вебхук')
+            statuses = await send_starts(url, [user_id + args.updates for user_id in user_ids[:5]])
+            check(all(status == 200 for status in statuses), 'вебхук обслуживается после смены ведущего процесса')
+    finally:
+        await stop_app(process)
+        stop_messages = fake.messages_by_chat[ADMIN_ID]
+        await fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    check(fake.requests['deleteWebhook'] == 0, 'вебхук не удалён при остановке')
+    # Сообщения о запуске: первый ведущий процесс и процесс, занявший его место
+    check(stop_messages == 3, f'одно сообщение администратору об остановке (всего сообщений {stop_messages})')
+    return 1 if failures else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Проверка запуска несколькими воркерами uvicorn')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--updates', type=int, default=30, help='количество обновлений /start')
+    parser.add_argument('--app-port', type=int, default=8100)
+    parser.add_argument('--telegram-port', type=int, default=8081)
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--settle', type=float, default=3, help='сколько ждать запуска всех воркеров, с')
+    arguments = parser.parse_args()
+    arguments.database_url = None
+    return arguments
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,53 @@
+"""
+Бенчмарк рендеринга коммерческого предложения: документов в секунду до и после кэша шаблонов.
+
+Сравниваются:
+    * DocxTemplate(путь к файлу) на каждый документ (прежний путь);
+    * копия разобранного шаблона из DocxTemplateCache (render_offer_docx).
+
+Запуск из корня проекта:
+    python -m benchmarks.offer_render
+"""
+import copy
+import timeit
+from io import BytesIO
+
+from docxtpl import DocxTemplate
+
+from app.commercial_offer.offer_docx import TEMPLATE_PATH, prepare_offer_data, render_offer_docx
+
+OFFER_DATA = prepare_offer_data({
+    "id": 1,
+    "company_name": 'ООО "Рога и Копыта"',
+    "phone_number": "+79001234567",
+    "email": "info@example.com",
+    "user_id": 100500,
+    "services": [
+        {"training_type": "Охрана труда", "training_program": f"Программа {i}", "training_rank": "3",
+         "people_count": i + 1, "price": 1500.0}
+        for i in range(5)
+    ],
+})
+
+
+def run(number: int = 50) -> dict:
+    def old_path():
+        doc = DocxTemplate(TEMPLATE_PATH)
+        doc.render(copy.deepcopy(OFFER_DATA))
+        doc.save(BytesIO())
+
+    def new_path():
+        render_offer_docx(copy.deepcopy(OFFER_DATA))
+
+    # Первый вызов разбирает шаблон и заполняет кэш
+    new_path()
+    results = {}
+    for name, func in (('DocxTemplate на каждый документ', old_path), ('кэш шаблонов', new_path)):
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        results[name] = round(number / seconds, 1)
+    return results
+
+
+if __name__ == '__main__':
+    for name, rate in run().items():
+        print(f'{name:<40} {rate:>8} документов/с')
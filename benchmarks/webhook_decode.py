@@ -0,0 +1,73 @@
+"""
+Микро-бенчмарк разбора обновлений вебхука: обновлений в секунду до и после.
+
+Сравниваются:
+    * json.loads + Update.model_validate (прежний путь /webhook);
+    * Update.model_validate_json напрямую из байтов (WebhookDecoder.decode);
+    * отбрасывание обновления неиспользуемого типа по началу тела (WebhookDecoder.is_unused).
+
+Запуск из корня проекта (нужен .env или переменные окружения из README):
+    python -m benchmarks.webhook_decode
+"""
+import json
+import timeit
+
+from aiogram.types import Update
+
+from app.bot.create_bot import bot
+from app.bot.webhook import WebhookDecoder
+
+MESSAGE_UPDATE = json.dumps({
+    "update_id": 123456789,
+    "message": {
+        "message_id": 42,
+        "from": {"id": 100500, "is_bot": False, "first_name": "Иван", "username": "ivan", "language_code": "ru"},
+        "chat": {"id": 100500, "first_name": "Иван", "username": "ivan", "type": "private"},
+        "date": 1729000000,
+        "text": "/start",
+        "entities": [{"offset": 0, "length": 6, "type": "bot_command"}],
+    },
+}, ensure_ascii=False).encode()
+
+UNUSED_UPDATE = json.dumps({
+    "update_id": 123456790,
+    "edited_message": {
+        "message_id": 42,
+        "from": {"id": 100500, "is_bot": False, "first_name": "Иван"},
+        "chat": {"id": 100500, "first_name": "Иван", "type": "private"},
+        "date": 1729000000,
+        "edit_date": 1729000001,
+        "text": "привет",
+    },
+}, ensure_ascii=False).encode()
+
+
+def run(number: int = 20000) -> dict:
+    decoder = WebhookDecoder()
+    decoder.set_used_update_types(['message', 'callback_query'])
+
+    def old_path():
+        Update.model_validate(json.loads(MESSAGE_UPDATE), context={'bot': bot})
+
+    def new_path():
+        decoder.decode(MESSAGE_UPDATE, bot)
+
+    def old_unused():
+        update = Update.model_validate(json.loads(UNUSED_UPDATE), context={'bot': bot})
+        return update.event_type not in decoder.used_update_types
+
+    def new_unused():
+        return decoder.is_unused(UNUSED_UPDATE)
+
+    results = {}
+    for name, func in (('dict + model_validate', old_path), ('model_validate_json', new_path),
+                       ('неиспользуемый тип, полный разбор', old_unused),
+                       ('неиспользуемый тип, is_unused', new_unused)):
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        results[name] = round(number / seconds)
+    return results
+
+
+if __name__ == '__main__':
+    for name, rate in run().items():
+        print(f'{name:<40} {rate:>12,} обновлений/с')
@@ -0,0 +1,106 @@
+import asyncio
+import json
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import pages_router
+from app.bot.outbox import outbox_worker
+from app.commercial_offer.renderer import offer_renderer
+from app.dao.dao import UserDAO, TrainingTypeDAO, TrainingProgramDAO, ApplicationDAO, OutboxMessageDAO
+from app.dao.session import unit_of_work
+from app.models import ApplicationStatus
+
+app = FastAPI()
+app.include_router(pages_router.router)
+
+
+@pytest.fixture
+def telegram(monkeypatch) -> list[tuple[str, int]]:
+    """Запросы к Telegram (метод, чат) и рендеринг без пула процессов."""
+    requests = []
+
+    async def send_document(chat_id, document):
+        requests.append(('send_document', chat_id))
+
+    async def send_message(chat_id, text, **kwargs):
+        requests.append(('send_message', chat_id))
+
+    async def render(offer_data: dict) -> bytes:
+        requests.append(('render', offer_data['id']))
+        return b'docx'
+
+    monkeypatch.setattr(pages_router.bot, 'send_document', send_document)
+    monkeypatch.setattr(pages_router.bot, 'send_message', send_message)
+    monkeypatch.setattr(offer_renderer, 'render', render)
+    monkeypatch.setattr(outbox_worker, 'wake', lambda: None)
+    return requests
+
+
+async def seed() -> int:
+    async with unit_of_work():
+        await UserDAO.register(telegram_id=5, first_name='Иван', username=None)
+        training_type = await TrainingTypeDAO.add(name='Охрана труда')
+        program = await TrainingProgramDAO.add(name='Программа А', training_type_id=training_type.id)
+        _, application_id = await ApplicationDAO.add_model(
+            user_id=5, company_name='ООО Ромашка', phone_number='+79990000000', email='a@example.com',
+            services=[{'training_type_id': training_type.id, 'training_program_id': program.id, 'people_count': 2}],
+        )
+    return application_id
+
+
+async def post_application_work(application_id: int, price) -> httpx.Response:
+    application = {'id': application_id, 'user_id': 5, 'company_name': 'ООО Ромашка',
+                   'services': [{'training_program': 'Программа А', 'training_rank': '', 'people_count': 2,
+                                 'price': price}]}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        # json.dumps, в отличие от httpx, пропускает Infinity, который принимает и request.json()
+        return await client.post('/application_work', content=json.dumps(application),
+                                 headers={'Content-Type': 'application/json'})
+
+
+async def application_state(application_id: int) -> tuple:
+    application = (await ApplicationDAO.get_applications_by_ids([application_id]))[0]
+    return application['status'], application['offer_total'], len(await OutboxMessageDAO.find_all(chat_id=5))
+
+
+def test_offer_is_saved_with_client_notice(database, telegram):
+    async def run():
+        application_id = await seed()
+        response = await post_application_work(application_id, 150.5)
+        assert response.status_code == 200
+        assert telegram == [('render', application_id), ('send_document', 1)]
+        # Клиенту сообщение отправит outbox_worker после фиксации
+        assert await application_state(application_id) == (ApplicationStatus.OFFER, Decimal('301.00'), 1)
+
+    asyncio.run(run())
+
+
+def test_invalid_total_is_rejected_before_rendering(database, telegram):
+    async def run():
+        application_id = await seed()
+        response = await post_application_work(application_id, float('inf'))
+        assert response.status_code == 400
+        assert telegram == []
+        assert await application_state(application_id) == (ApplicationStatus.IN_WORK, None, 0)
+
+    asyncio.run(run())
+
+
+def test_client_is_not_notified_when_status_is_not_saved(database, telegram, monkeypatch):
+    async def update(filter_by, **values):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(ApplicationDAO, 'update', update)
+
+    async def run():
+        application_id = await seed()
+        response = await post_application_work(application_id, 150)
+        assert response.status_code == 500
+        assert ('send_message', 5) not in telegram
+        assert await application_state(application_id) == (ApplicationStatus.IN_WORK, None, 0)
+
+    asyncio.run(run())
@@ -0,0 +1,124 @@
+import asyncio
+import io
+import zipfile
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.pages_router import router
+from app.bot.outbox import outbox_worker
+from app.commercial_offer.renderer import offer_renderer
+from app.config import settings
+from app.dao.dao import UserDAO, TrainingTypeDAO, TrainingProgramDAO, ApplicationDAO, OutboxMessageDAO
+from app.dao.session import unit_of_work
+from app.models import ApplicationStatus
+
+app = FastAPI()
+app.include_router(router)
+
+
+@pytest.fixture(autouse=True)
+def no_outbox_delivery(monkeypatch):
+    monkeypatch.setattr(outbox_worker, 'wake', lambda: None)
+
+
+async def seed(count: int = 1) -> list[int]:
+    async with unit_of_work():
+        await UserDAO.register(telegram_id=5, first_name='Иван', username=None)
+        training_type = await TrainingTypeDAO.add(name='Охрана труда')
+        program = await TrainingProgramDAO.add(name='Программа А', training_type_id=training_type.id)
+        application_ids = []
+        for _ in range(count):
+            _, application_id = await ApplicationDAO.add_model(
+                user_id=5, company_name='ООО Ромашка', phone_number='+79990000000', email='a@example.com',
+                services=[{'training_type_id': training_type.id, 'training_program_id': program.id,
+                           'people_count': 2}],
+            )
+            application_ids.append(application_id)
+    return application_ids
+
+
+async def post_bulk_offers(application_ids: list[int]) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        return await client.post('/bulk_offers', json={
+            'offers': [{'id': application_id, 'prices': [100]} for application_id in application_ids]
+        })
+
+
+async def statuses(application_ids: list[int]) -> list[ApplicationStatus]:
+    return [application['status'] for application in await ApplicationDAO.get_applications_by_ids(application_ids)]
+
+
+@pytest.mark.parametrize('spool_size', [1, 16 * 1024 * 1024])
+def test_statuses_are_committed_after_all_documents_are_rendered(database, monkeypatch, spool_size):
+    statuses_when_rendered = []
+
+    async def render(offer_data: dict) -> bytes:
+        statuses_when_rendered.extend(await statuses([offer_data['id']]))
+        return f"docx {offer_data['id']}".encode()
+
+    monkeypatch.setattr(offer_renderer, 'render', render)
+    # Архив в памяти и во временном файле
+    monkeypatch.setattr(settings, 'BULK_OFFERS_SPOOL_SIZE', spool_size)
+
+    async def run():
+        application_ids = await seed(2)
+        response = await post_bulk_offers(application_ids)
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/zip'
+        assert int(response.headers['content-length']) == len(response.content)
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert {name: archive.read(name) for name in archive.namelist()} == {
+                f'offer_{application_id}.docx': f'docx {application_id}'.encode()
+                for application_id in application_ids
+            }
+        assert statuses_when_rendered == [ApplicationStatus.IN_WORK] * 2
+        assert await statuses(application_ids) == [ApplicationStatus.OFFER] * 2
+        assert [message.chat_id for message in await OutboxMessageDAO.find_all()] == [5, 5]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('error, status_code', [(asyncio.TimeoutError, 504), (RuntimeError, 500)])
+def test_render_failure_leaves_applications_in_work(database, monkeypatch, error, status_code):
+    rendered = []
+
+    async def render(offer_data: dict) -> bytes:
+        rendered.append(offer_data['id'])
+        if len(rendered) == 2:
+            raise error()
+        return b'docx'
+
+    monkeypatch.setattr(offer_renderer, 'render', render)
+
+    async def run():
+        application_ids = await seed(3)
+        response = await post_bulk_offers(application_ids)
+        assert response.status_code == status_code
+        assert len(rendered) >= 2
+        assert await statuses(application_ids) == [ApplicationStatus.IN_WORK] * 3
+        assert await OutboxMessageDAO.find_all() == []
+
+    asyncio.run(run())
+
+
+def test_status_update_failure_is_reported(database, monkeypatch):
+    async def render(offer_data: dict) -> bytes:
+        return b'docx'
+
+    async def set_offers(offer_totals):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(offer_renderer, 'render', render)
+    monkeypatch.setattr(ApplicationDAO, 'set_offers', set_offers)
+
+    async def run():
+        application_ids = await seed()
+        response = await post_bulk_offers(application_ids)
+        assert response.status_code == 500
+        assert await statuses(application_ids) == [ApplicationStatus.IN_WORK]
+        assert await OutboxMessageDAO.find_all() == []
+
+    asyncio.run(run())
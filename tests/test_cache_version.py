@@ -0,0 +1,62 @@
+"""
+Кэши в памяти процесса сбрасываются после записи в другом процессе приложения. Другой процесс имитируется
+вторым экземпляром кэша с собственной SharedCacheVersion на той же базе данных.
+"""
+import asyncio
+
+from app.dao.cache_version import SharedCacheVersion
+from app.dao.catalog_cache import CatalogCache, catalog_cache
+from app.dao.dao import UserDAO, TrainingTypeDAO
+from app.dao.user_cache import KnownUserCache
+
+
+def test_catalog_write_in_other_process_invalidates_catalog(database, monkeypatch):
+    monkeypatch.setattr(catalog_cache.shared_version, 'ttl', 0)
+    other_process = CatalogCache(SharedCacheVersion('catalog', ttl=0))
+
+    async def run():
+        await TrainingTypeDAO.add(name='Охрана труда')
+        etag = await other_process.get_etag()
+        assert await catalog_cache.get_etag() == etag
+        misses = catalog_cache.misses
+
+        await TrainingTypeDAO.add(name='Пожарная безопасность')
+        new_etag = await other_process.get_etag()
+        assert new_etag != etag
+        assert 'Пожарная безопасность'.encode() in other_process.types_body
+        # Свой кэш процесс сбросил сразу после записи и не сбрасывает его повторно из-за своей же версии
+        assert await catalog_cache.get_etag() == new_etag
+        assert await catalog_cache.get_etag() == new_etag
+        assert catalog_cache.misses == misses + 1
+
+    asyncio.run(run())
+
+
+def test_version_is_checked_once_per_ttl(database):
+    other_process = CatalogCache(SharedCacheVersion('catalog', ttl=60))
+
+    async def run():
+        etag = await other_process.get_etag()
+        await TrainingTypeDAO.add(name='Охрана труда')
+        # До истечения ttl процесс отдаёт прежнюю версию справочника без обращения к базе данных
+        assert await other_process.get_etag() == etag
+        other_process.shared_version.ttl = 0
+        assert await other_process.get_etag() != etag
+
+    asyncio.run(run())
+
+
+def test_user_delete_in_other_process_clears_known_users(database):
+    other_process = KnownUserCache(maxsize=10, shared_version=SharedCacheVersion('users', ttl=0))
+    profile = ('Иван', None)
+
+    async def run():
+        await UserDAO.register(telegram_id=7, first_name='Иван', username=None)
+        await other_process.revalidate()
+        other_process.remember(7, profile)
+
+        await UserDAO.delete(telegram_id=7)
+        await other_process.revalidate()
+        assert not other_process.is_known(7, profile)
+
+    asyncio.run(run())
@@ -0,0 +1,44 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.pages_router import router
+from app.config import settings
+from app.dao.dao import TrainingTypeDAO, TrainingProgramDAO
+from app.dao.session import unit_of_work
+
+app = FastAPI()
+app.include_router(router)
+
+
+def test_catalog_conditional_get(database):
+    async def run():
+        async with unit_of_work():
+            training_type = await TrainingTypeDAO.add(name='Охрана труда')
+            await TrainingProgramDAO.add(name='Программа А', training_type_id=training_type.id)
+            type_id = training_type.id
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.get('/get_training_types')
+            assert response.status_code == 200
+            assert response.headers['cache-control'] == f'public, max-age={settings.CATALOG_MAX_AGE}'
+            assert [item['name'] for item in response.json()['types']] == ['Охрана труда']
+            etag = response.headers['etag']
+
+            response = await client.get('/get_training_types', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert response.content == b''
+            assert response.headers['etag'] == etag
+            response = await client.get('/get_programs', params={'type_id': type_id},
+                                        headers={'If-None-Match': f'W/{etag}'})
+            assert response.status_code == 304
+
+            # Запись в справочник сбрасывает кэш, прежний ETag больше не совпадает
+            await TrainingTypeDAO.add(name='Пожарная безопасность')
+            response = await client.get('/get_training_types', headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert response.headers['etag'] != etag
+            assert [item['name'] for item in response.json()['types']] == ['Охрана труда', 'Пожарная безопасность']
+
+    asyncio.run(run())
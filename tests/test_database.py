@@ -0,0 +1,66 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.dao.dao import UserDAO, TrainingTypeDAO, TrainingProgramDAO, ApplicationDAO
+from app.dao.session import unit_of_work
+from app.dao.user_cache import known_users
+from app.database import Base
+from app.migration.create_schema import create_schema, get_script_directory
+from app.models import ApplicationStatus
+
+
+def _inspect_schema(connection) -> tuple[str | None, list]:
+    """Текущая ревизия базы и расхождения её схемы с моделями."""
+    migration_context = MigrationContext.configure(connection)
+    return migration_context.get_current_revision(), compare_metadata(migration_context, Base.metadata)
+
+
+def test_new_database(database):
+    """Новая база создаётся по моделям, отмечается последней ревизией и работает через DAO."""
+    async def run():
+        async with database.connect() as connection:
+            revision, diff = await connection.run_sync(_inspect_schema)
+        assert revision == get_script_directory().get_current_head()
+        assert diff == []
+
+        assert await UserDAO.register(telegram_id=10, first_name='Иван', username=None) is True
+        known_users.clear()
+        assert await UserDAO.register(telegram_id=10, first_name='Пётр', username='petr') is False
+        user = await UserDAO.find_one_or_none(telegram_id=10)
+        assert (user.first_name, user.username) == ('Пётр', 'petr')
+
+        async with unit_of_work():
+            training_type = await TrainingTypeDAO.add(name='Охрана труда')
+            program = await TrainingProgramDAO.add(name='Программа А', training_type_id=training_type.id)
+            training_type_id, program_id = training_type.id, program.id
+        _, application_id = await ApplicationDAO.add_model(
+            user_id=10, company_name='ООО Ромашка', phone_number='+79990000000', email='a@example.com',
+            services=[{'training_type_id': training_type_id, 'training_program_id': program_id, 'people_count': 3}],
+        )
+        await ApplicationDAO.set_offers({application_id: Decimal('1500.50')})
+        applications, next_before_id = await ApplicationDAO.get_applications_page(10, in_work=False)
+        assert next_before_id is None
+        assert [(a.id, a.status, a.offer_total) for a in applications] == [
+            (application_id, ApplicationStatus.OFFER, Decimal('1500.50'))
+        ]
+        assert [service.training_program for service in applications[0].services] == ['Программа А']
+
+    asyncio.run(run())
+
+
+def test_create_schema_refuses_existing_database(tmp_path):
+    async def run():
+        engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "db.sqlite3"}')
+        try:
+            await create_schema(engine)
+            with pytest.raises(RuntimeError):
+                await create_schema(engine)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
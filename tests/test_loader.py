@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.dao.dao import TrainingProgramDAO, TrainingTypeDAO
+from app.dao.loader import BatchLoader
+from app.dao.session import unit_of_work
+from app.metrics import DAO_CALL_DURATION
+
+
+async def seed_programs() -> list[int]:
+    async with unit_of_work():
+        training_type = await TrainingTypeDAO.add(name='Охрана труда')
+        programs = await TrainingProgramDAO.add_many([
+            {'name': name, 'training_type_id': training_type.id} for name in ('А', 'Б', 'В')
+        ])
+        return [program.id for program in programs]
+
+
+def queries() -> int:
+    return DAO_CALL_DURATION.count(dao='TrainingProgramDAO', method='find_many_by_ids')
+
+
+def test_concurrent_loads_are_batched(database):
+    async def run():
+        program_ids = await seed_programs()
+        before = queries()
+        async with unit_of_work():
+            loader = BatchLoader(TrainingProgramDAO)
+            requested = [program_ids[2], 999, program_ids[0], program_ids[2]]
+            programs = await asyncio.gather(*(loader.load(i) for i in requested))
+            assert [program and program.name for program in programs] == ['В', None, 'А', 'В']
+            assert queries() == before + 1
+            # Загруженные записи запоминаются, новые id загружаются следующим запросом
+            assert [program.name for program in await loader.load_many(program_ids)] == ['А', 'Б', 'В']
+            assert queries() == before + 2
+
+    asyncio.run(run())
+
+
+def test_failed_batch_is_retried(database, monkeypatch):
+    async def run():
+        program_ids = await seed_programs()
+        find_many_by_ids = TrainingProgramDAO.find_many_by_ids
+        calls = []
+
+        async def failing_once(data_ids):
+            calls.append(data_ids)
+            if len(calls) == 1:
+                raise RuntimeError('database is locked')
+            return await find_many_by_ids(data_ids)
+
+        monkeypatch.setattr(TrainingProgramDAO, 'find_many_by_ids', failing_once)
+        loader = BatchLoader(TrainingProgramDAO)
+        with pytest.raises(RuntimeError):
+            await loader.load_many(program_ids)
+        assert [program.name for program in await loader.load_many(program_ids)] == ['А', 'Б', 'В']
+        assert len(calls) == 2
+
+    asyncio.run(run())
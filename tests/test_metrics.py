@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from aiogram.methods import GetUpdates, SendMessage
+
+from app.bot.outbound import TelegramMetricsMiddleware
+from app.dao.dao import UserDAO
+from app.metrics import DAO_CALL_DURATION, DAO_CALL_ERRORS, TELEGRAM_REQUEST_DURATION, TELEGRAM_REQUESTS
+
+
+def test_overridden_dao_method_is_observed_once(database):
+    async def run():
+        await UserDAO.register(telegram_id=7, first_name='Иван', username=None)
+        calls = DAO_CALL_DURATION.count(dao='UserDAO', method='delete')
+        errors = DAO_CALL_ERRORS.value(dao='UserDAO', method='delete')
+        # UserDAO.delete вызывает BaseDAO.delete через super(), обе функции обёрнуты
+        assert await UserDAO.delete(telegram_id=7) == 1
+        with pytest.raises(ValueError):
+            await UserDAO.delete()
+        assert DAO_CALL_DURATION.count(dao='UserDAO', method='delete') == calls + 2
+        assert DAO_CALL_ERRORS.value(dao='UserDAO', method='delete') == errors + 1
+
+    asyncio.run(run())
+
+
+def test_get_updates_is_counted_but_not_timed():
+    async def make_request(bot, method):
+        return []
+
+    async def run():
+        middleware = TelegramMetricsMiddleware()
+        timed = TELEGRAM_REQUEST_DURATION.count(method='GetUpdates')
+        counted = TELEGRAM_REQUESTS.value(method='GetUpdates', code='200')
+        sent = TELEGRAM_REQUEST_DURATION.count(method='SendMessage')
+        await middleware(make_request, None, GetUpdates(timeout=30))
+        await middleware(make_request, None, SendMessage(chat_id=1, text='a'))
+        assert TELEGRAM_REQUEST_DURATION.count(method='GetUpdates') == timed
+        assert TELEGRAM_REQUESTS.value(method='GetUpdates', code='200') == counted + 1
+        assert TELEGRAM_REQUEST_DURATION.count(method='SendMessage') == sent + 1
+
+    asyncio.run(run())
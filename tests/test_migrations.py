@@ -0,0 +1,103 @@
+import asyncio
+from decimal import Decimal
+
+import sqlalchemy as sa
+from alembic.config import Config
+from alembic.runtime.environment import EnvironmentContext
+
+from app.database import Base
+from app.migration.create_schema import get_script_directory
+from app.models import ApplicationStatus
+
+# Ревизия перед переходом от текстового статуса заявки к коду статуса (14b8779dcbf8)
+TEXT_STATUS_REVISION = 'b5cc52e4ee1d'
+
+LEGACY_STATUSES = {
+    1: 'В работе',
+    2: ' В работе ',
+    3: 'Предложение 12345.5',
+    4: 'Предложение 700,25',
+    5: 'Предложение 1500',
+    6: 'Предложение 1500',
+    7: 'Отработана',
+}
+UPGRADED = {
+    1: (ApplicationStatus.IN_WORK, None),
+    2: (ApplicationStatus.IN_WORK, None),
+    3: (ApplicationStatus.OFFER, Decimal('12345.50')),
+    4: (ApplicationStatus.OFFER, Decimal('700.25')),
+    5: (ApplicationStatus.OFFER, Decimal('1500.00')),
+    6: (ApplicationStatus.OFFER, Decimal('1500.00')),
+    # Текст без суммы: заявка отработана, сумма неизвестна
+    7: (ApplicationStatus.OFFER, None),
+}
+DOWNGRADED = {
+    1: 'В работе',
+    2: 'В работе',
+    3: 'Предложение 12345.5',
+    4: 'Предложение 700.25',
+    5: 'Предложение 1500',
+    6: 'Предложение 1500',
+    7: 'Предложение',
+}
+
+
+def _migrate(connection, destination: str, downgrade: bool = False) -> None:
+    """Применяет ревизии до destination (или откатывает до неё при downgrade=True) на соединении connection."""
+    script = get_script_directory()
+
+    def migrations(revision, context):
+        if downgrade:
+            return script._downgrade_revs(destination, revision)
+        return script._upgrade_revs(destination, revision)
+
+    with EnvironmentContext(Config(), script, fn=migrations, destination_rev=destination) as environment:
+        environment.configure(connection=connection, target_metadata=Base.metadata,
+                              render_as_batch=connection.dialect.name == 'sqlite')
+        with environment.begin_transaction():
+            environment.run_migrations()
+
+
+def _seed_text_statuses(connection) -> None:
+    metadata = sa.MetaData()
+    users, applications = (sa.Table(name, metadata, autoload_with=connection) for name in ('users', 'applications'))
+    assert isinstance(applications.c.status.type, sa.String)
+    connection.execute(users.insert().values(telegram_id=5, first_name='Иван'))
+    connection.execute(applications.insert(), [
+        {'id': application_id, 'user_id': 5, 'company_name': 'ООО Ромашка', 'phone_number': '+79990000000',
+         'email': 'a@example.com', 'status': status}
+        for application_id, status in LEGACY_STATUSES.items()
+    ])
+
+
+def _statuses(connection) -> dict:
+    applications = sa.Table('applications', sa.MetaData(), autoload_with=connection)
+    columns = [applications.c.status]
+    if 'offer_total' in applications.c:
+        columns.append(applications.c.offer_total)
+    rows = connection.execute(sa.select(applications.c.id, *columns).order_by(applications.c.id))
+    return {row[0]: tuple(row[1:]) if len(row) > 2 else row[1] for row in rows}
+
+
+def test_status_migration_round_trip(database):
+    """Текстовые статусы переводятся в код статуса и сумму предложения и обратно."""
+    head = get_script_directory().get_current_head()
+
+    def run(connection) -> None:
+        _migrate(connection, TEXT_STATUS_REVISION, downgrade=True)
+        _seed_text_statuses(connection)
+
+        _migrate(connection, head)
+        assert _statuses(connection) == UPGRADED
+
+        _migrate(connection, TEXT_STATUS_REVISION, downgrade=True)
+        assert _statuses(connection) == DOWNGRADED
+
+        _migrate(connection, head)
+        assert _statuses(connection) == UPGRADED
+
+    async def main():
+        async with database.begin() as connection:
+            await connection.run_sync(run)
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import argparse
+import asyncio
+import socket
+
+import pytest
+
+pytest.importorskip('uvicorn')
+pytest.importorskip('aiohttp')
+
+from benchmarks import multi_worker
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_multiple_workers():
+    """
+    Приложение в нескольких процессах uvicorn: один ведущий процесс, смена ведущего после его аварийного
+    завершения и общий для всех воркеров справочник (см. benchmarks.multi_worker).
+    """
+    args = argparse.Namespace(workers=3, updates=10, app_port=free_port(), telegram_port=free_port(),
+                              startup_timeout=60, settle=2, database_url=None)
+    assert asyncio.run(multi_worker.main(args)) == 0
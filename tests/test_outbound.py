@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from app.bot.outbound import OutboundLimiter
+
+
+def test_retry_after_in_one_chat_delays_other_chats():
+    """Ответ 429 в чате A приостанавливает отправку и в чат B."""
+    retry_after = 1
+    sent_at = {}
+
+    async def make_request(bot, method):
+        if method.chat_id == 'A' and 'A' not in sent_at:
+            sent_at['A'] = None
+            raise TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=retry_after)
+        sent_at[method.chat_id] = time.monotonic()
+        return True
+
+    async def send_b_after_a_is_limited(limiter):
+        while 'A' not in sent_at:
+            await asyncio.sleep(0.01)
+        await limiter(make_request, None, SendMessage(chat_id='B', text='b'))
+
+    async def run():
+        limiter = OutboundLimiter(rate=100, chat_rate=100, chat_burst=10, concurrency=10, max_retries=1)
+        started = time.monotonic()
+        await asyncio.gather(limiter(make_request, None, SendMessage(chat_id='A', text='a')),
+                             send_b_after_a_is_limited(limiter))
+        return started
+
+    started = asyncio.run(run())
+    assert sent_at['A'] - started >= retry_after
+    assert sent_at['B'] - started >= retry_after
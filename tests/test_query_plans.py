@@ -0,0 +1,101 @@
+"""
+Планы запросов DAO: запросы к горячим таблицам должны использовать индексы, а не полный перебор.
+
+Запросы DAO выполняются на временной базе с тестовыми данными, перехваченный SQL объясняется
+(EXPLAIN QUERY PLAN для SQLite, EXPLAIN для PostgreSQL) и в плане проверяется ожидаемый индекс.
+"""
+import asyncio
+import re
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.dao.dao import UserDAO, TrainingTypeDAO, TrainingProgramDAO, ApplicationDAO
+from app.dao.session import unit_of_work
+
+# (вызов DAO, таблица основного запроса, индекс, который должен использовать основной запрос)
+CHECKS = {
+    'программы вида обучения': (lambda: TrainingProgramDAO.find_all(training_type_id=1),
+                                'training_programs', 'ix_training_programs_training_type_id'),
+    'заявки пользователя': (lambda: ApplicationDAO.get_applications(1, admin=False, limit=20),
+                            'applications', 'ix_applications_user_id_status'),
+    'заявки в работе': (lambda: ApplicationDAO.get_applications(None, admin=True, in_work=True, limit=20),
+                        'applications', 'ix_applications_status_id'),
+    'архив заявок': (lambda: ApplicationDAO.get_applications(None, admin=True, in_work=False, limit=20),
+                     'applications', 'ix_applications_status_id'),
+    'сводка по статусам': (ApplicationDAO.get_status_summary,
+                           'applications', 'ix_applications_status_id'),
+    'услуги заявок': (lambda: ApplicationDAO.get_applications(None, admin=True, limit=20),
+                      'application_services', 'ix_application_services_application_id'),
+}
+
+
+async def seed() -> None:
+    """Два пользователя, справочник и заявки в обоих статусах."""
+    async with unit_of_work():
+        for telegram_id in (1, 2):
+            await UserDAO.register(telegram_id=telegram_id, first_name=f'Пользователь {telegram_id}', username=None)
+        training_type = await TrainingTypeDAO.add(name='Охрана труда')
+        programs = await TrainingProgramDAO.add_many([
+            {'name': f'Программа {i}', 'training_type_id': training_type.id} for i in range(5)
+        ])
+        application_ids = []
+        for i in range(10):
+            _, application_id = await ApplicationDAO.add_model(
+                user_id=1 + i % 2, company_name=f'Компания {i}', phone_number='+79990000000', email='a@example.com',
+                services=[{'training_type_id': training_type.id, 'training_program_id': program.id, 'people_count': 1}
+                          for program in programs[:1 + i % 3]],
+            )
+            application_ids.append(application_id)
+        await ApplicationDAO.set_offers({application_id: 1000 for application_id in application_ids[::2]})
+
+
+async def capture(engine: AsyncEngine, call) -> list[tuple[str, object]]:
+    """Выполняет вызов DAO и возвращает выполненные им запросы вместе с параметрами."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        await call()
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+async def explain(engine: AsyncEngine, statement: str, parameters) -> str:
+    async with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            result = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            return '\n'.join(row[-1] for row in result)
+        # На маленьких таблицах PostgreSQL выбирает полный перебор независимо от индексов.
+        # Настройка действует только в этом соединении тестовой базы
+        await conn.exec_driver_sql('SET enable_seqscan = off')
+        result = await conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+        return '\n'.join(row[0] for row in result)
+
+
+def is_full_scan(engine: AsyncEngine, plan: str, table: str) -> bool:
+    if engine.dialect.name == 'sqlite':
+        return re.search(rf'^SCAN {table}\b(?!.*USING (COVERING )?INDEX)', plan, re.MULTILINE) is not None
+    return re.search(rf'Seq Scan on {table}\b', plan) is not None
+
+
+@pytest.mark.parametrize('name', CHECKS)
+def test_query_uses_index(database, name):
+    call, table, index = CHECKS[name]
+
+    async def run() -> str:
+        await seed()
+        statements = await capture(database, call)
+        plans = [await explain(database, statement, parameters) for statement, parameters in statements
+                 if re.search(rf'\b(FROM|JOIN) {table}\b', statement)]
+        assert plans, f'запрос к {table} не выполнялся'
+        return '\n'.join(plans)
+
+    plan = asyncio.run(run())
+    assert index in plan, plan
+    assert not is_full_scan(database, plan, table), plan
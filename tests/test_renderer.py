@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app.commercial_offer.renderer import OfferRenderer
+
+
+class FailingRenderer(OfferRenderer):
+    """Первый документ не рендерится, остальные рендерятся дольше и тоже завершаются ошибкой."""
+
+    def __init__(self):
+        super().__init__(workers=0, timeout=1)
+        self.started: list[asyncio.Task] = []
+
+    async def render(self, offer_data: dict) -> bytes:
+        self.started.append(asyncio.current_task())
+        await asyncio.sleep(0.01 if offer_data['id'] == 0 else 0.05)
+        raise RuntimeError(f"не удалось отрендерить {offer_data['id']}")
+
+
+def test_render_many_cancels_and_awaits_remaining_tasks_on_error():
+    async def run():
+        renderer = FailingRenderer()
+        with pytest.raises(RuntimeError, match='отрендерить 0'):
+            async for _ in renderer.render_many([{'id': i} for i in range(4)], window=4):
+                pass
+        # Сразу после ошибки все задачи уже завершены (отменены), а не брошены с непрочитанным исключением
+        assert len(renderer.started) == 4
+        assert all(task.done() for task in renderer.started)
+        assert all(task.cancelled() for task in renderer.started[1:])
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from aiogram.types import User as TelegramUser
+from sqlalchemy import func, select
+
+from app.bot.handlers.user_router import cmd_start
+from app.dao import session as dao_session
+from app.models import User
+
+TELEGRAM_LATENCY = 0.3
+
+
+class FakeMessage:
+    """Сообщение /start: ответ ждёт TELEGRAM_LATENCY и запоминает, сохранён ли уже пользователь."""
+
+    def __init__(self, telegram_id: int):
+        self.from_user = TelegramUser(id=telegram_id, is_bot=False, first_name=f'Пользователь {telegram_id}')
+        self.greeting = None
+        self.registered_before_greeting = None
+
+    async def answer(self, text: str, **kwargs) -> None:
+        self.greeting = text
+        async with dao_session.async_session_maker() as session:
+            self.registered_before_greeting = await session.scalar(
+                select(func.count()).select_from(User).where(User.telegram_id == self.from_user.id)) == 1
+        await asyncio.sleep(TELEGRAM_LATENCY)
+
+
+def test_concurrent_start(database):
+    new_users = [FakeMessage(telegram_id) for telegram_id in range(100, 108)]
+    repeated = [FakeMessage(42) for _ in range(8)]
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(cmd_start(message) for message in new_users + repeated))
+        elapsed = time.monotonic() - started
+        async with dao_session.async_session_maker() as session:
+            users = await session.scalar(select(func.count()).select_from(User))
+        return elapsed, users
+
+    elapsed, users = asyncio.run(run())
+    messages = new_users + repeated
+    assert users == len(new_users) + 1
+    assert all(message.registered_before_greeting for message in messages)
+    assert all(message.greeting.startswith('Добро пожаловать') for message in new_users)
+    # Пользователь 42 зарегистрирован одним из одновременных /start, остальные его приветствуют повторно
+    assert sum(message.greeting.startswith('Добро пожаловать') for message in repeated) == 1
+    # Приветствия отправляются параллельно, а не по очереди после транзакций друг друга
+    assert elapsed < len(messages) * TELEGRAM_LATENCY / 2
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.pages_router import router
+from app.bot.outbox import outbox_worker
+from app.dao.dao import UserDAO, TrainingTypeDAO, TrainingProgramDAO, OutboxMessageDAO
+from app.dao.session import unit_of_work
+from app.metrics import DAO_CALL_DURATION
+
+app = FastAPI()
+app.include_router(router)
+
+
+async def seed() -> tuple[int, list[int]]:
+    async with unit_of_work():
+        await UserDAO.register(telegram_id=5, first_name='Иван', username='ivan')
+        training_type = await TrainingTypeDAO.add(name='Охрана труда')
+        programs = await TrainingProgramDAO.add_many([
+            {'name': name, 'training_type_id': training_type.id} for name in ('Программа А', 'Программа Б')
+        ])
+        return training_type.id, [program.id for program in programs]
+
+
+async def submit(type_id: int, program_ids: list[int]) -> httpx.Response:
+    services = [{'training_type_id': type_id, 'training_program_id': program_id, 'training_rank': '',
+                 'people_count': 2} for program_id in program_ids]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        return await client.post('/submit_application', json={
+            'user_id': 5, 'company_name': 'ООО Ромашка', 'phone_number': '+79990000000',
+            'email': 'a@example.com', 'services': services,
+        })
+
+
+def test_programs_of_all_services_are_loaded_with_one_query(database, monkeypatch):
+    monkeypatch.setattr(outbox_worker, 'wake', lambda: None)
+
+    async def run():
+        type_id, (program_a, program_b) = await seed()
+        queries = DAO_CALL_DURATION.count(dao='TrainingProgramDAO', method='find_many_by_ids')
+        response = await submit(type_id, [program_b, program_a, program_b])
+        assert response.status_code == 200
+        assert DAO_CALL_DURATION.count(dao='TrainingProgramDAO', method='find_many_by_ids') == queries + 1
+        client_message = (await OutboxMessageDAO.find_all(chat_id=5))[0]
+        lines = [line.strip() for line in client_message.text.splitlines() if '➤' in line]
+        assert lines == ['➤ Программа Б в количестве 2 человек', '➤ Программа А в количестве 2 человек',
+                         '➤ Программа Б в количестве 2 человек']
+
+        response = await submit(type_id, [program_a, 999])
+        assert response.status_code == 400
+        assert response.json()['message'] == 'Программа обучения не найдена'
+
+    asyncio.run(run())
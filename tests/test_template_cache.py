@@ -0,0 +1,54 @@
+import os
+from io import BytesIO
+
+from docx import Document
+
+from app.commercial_offer.template_cache import DocxTemplateCache
+
+
+def write_template(path, text: str) -> None:
+    document = Document()
+    document.add_paragraph(text)
+    document.save(path)
+
+
+def render(cache: DocxTemplateCache, context: dict) -> str:
+    template = cache.get('offer')
+    template.render(context)
+    output = BytesIO()
+    template.save(output)
+    return '\n'.join(paragraph.text for paragraph in Document(BytesIO(output.getvalue())).paragraphs)
+
+
+def test_changed_template_is_reloaded(tmp_path):
+    path = tmp_path / 'offer.docx'
+    write_template(path, 'Предложение для {{ company }}')
+    cache = DocxTemplateCache({'offer': str(path)})
+    assert render(cache, {'company': 'ООО Ромашка'}) == 'Предложение для ООО Ромашка'
+    assert render(cache, {'company': 'ООО Лютик'}) == 'Предложение для ООО Лютик'
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    mtime = os.stat(path).st_mtime_ns
+    write_template(path, 'Коммерческое предложение: {{ company }}')
+    # Время модификации должно отличаться даже на файловой системе с грубым разрешением
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+    assert render(cache, {'company': 'ООО Ромашка'}) == 'Коммерческое предложение: ООО Ромашка'
+    assert (cache.misses, cache.hits) == (2, 1)
+
+
+def test_renders_do_not_share_state(tmp_path):
+    path = tmp_path / 'offer.docx'
+    write_template(path, '{% for item in items %}{{ item }};{% endfor %}')
+    cache = DocxTemplateCache({'offer': str(path)})
+    first, second = cache.get('offer'), cache.get('offer')
+    first.render({'items': ['a', 'b']})
+    second.render({'items': ['c']})
+    texts = []
+    for template in (first, second):
+        output = BytesIO()
+        template.save(output)
+        texts.append(Document(BytesIO(output.getvalue())).paragraphs[0].text)
+    assert texts == ['a;b;', 'c;']
+    # Разобранный документ в кэше остаётся шаблоном
+    assert render(cache, {'items': []}) == ''
+    assert cache.misses == 1
@@ -0,0 +1,65 @@
+import asyncio
+import datetime
+
+from aiogram.types import Chat, Message, Update
+
+from app.bot.update_queue import UpdateQueue
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    message = Message(message_id=update_id, date=datetime.datetime.now(), chat=Chat(id=chat_id, type='private'),
+                      text=str(update_id))
+    return Update(update_id=update_id, message=message)
+
+
+class FakeDispatcher:
+    """Запоминает порядок обработки; обновления первого чата обрабатываются дольше остальных."""
+
+    def __init__(self, slow_chat_id: int):
+        self.slow_chat_id = slow_chat_id
+        self.handled: list[tuple[int, int]] = []
+
+    async def feed_update(self, bot, update: Update) -> None:
+        chat_id = update.message.chat.id
+        await asyncio.sleep(0.05 if chat_id == self.slow_chat_id else 0)
+        self.handled.append((chat_id, update.update_id))
+
+
+def test_updates_of_one_chat_are_handled_in_order():
+    async def run():
+        queue = UpdateQueue(workers=4, maxsize=100, put_timeout=1, dedup_size=100)
+        dp = FakeDispatcher(slow_chat_id=1)
+        queue.start(None, dp)
+        for update_id in range(10):
+            assert await queue.put(make_update(update_id, chat_id=1 if update_id % 2 else 2))
+        await queue.stop()
+        assert [update_id for chat_id, update_id in dp.handled if chat_id == 1] == [1, 3, 5, 7, 9]
+        assert [update_id for chat_id, update_id in dp.handled if chat_id == 2] == [0, 2, 4, 6, 8]
+        # Медленный чат не задерживает остальные
+        assert dp.handled[0][0] == 2
+
+    asyncio.run(run())
+
+
+def test_duplicate_update_ids_are_rejected():
+    queue = UpdateQueue(workers=1, maxsize=10, put_timeout=1, dedup_size=2)
+    assert not queue.is_duplicate(1)
+    assert queue.is_duplicate(1)
+    queue.forget(1)
+    assert not queue.is_duplicate(1)
+    assert not queue.is_duplicate(2)
+    assert not queue.is_duplicate(3)
+    # В памяти хранятся только последние dedup_size идентификаторов
+    assert not queue.is_duplicate(1)
+    assert queue.is_duplicate(3)
+
+
+def test_put_fails_when_queue_is_full():
+    async def run():
+        queue = UpdateQueue(workers=1, maxsize=2, put_timeout=0.05, dedup_size=10)
+        assert await queue.put(make_update(1, chat_id=1))
+        assert await queue.put(make_update(2, chat_id=1))
+        assert not await queue.put(make_update(3, chat_id=1))
+        assert queue.qsize() == 2
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import main
+from app.bot.update_queue import update_queue
+from app.bot.webhook import webhook_decoder
+from app.config import settings
+
+SECRET = 'webhook-secret'
+UPDATE = {'update_id': 1001, 'message': {'message_id': 1, 'date': 1700000000, 'text': '/start',
+                                         'chat': {'id': 5, 'type': 'private'}}}
+
+
+@pytest.fixture
+def handled(monkeypatch) -> list[int]:
+    """Обработка обновлений напрямую в вебхуке; возвращает update_id обработанных обновлений."""
+    handled = []
+
+    async def feed_update(bot, update):
+        handled.append(update.update_id)
+
+    monkeypatch.setattr(webhook_decoder, 'secret_token', SECRET)
+    monkeypatch.setattr(settings, 'WEBHOOK_QUEUE', False)
+    monkeypatch.setattr(main.dp, 'feed_update', feed_update)
+    update_queue.forget(UPDATE['update_id'])
+    yield handled
+    update_queue.forget(UPDATE['update_id'])
+
+
+def post_webhook(body: bytes, secret: str | None = SECRET) -> httpx.Response:
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+            return await client.post('/webhook', content=body, headers=headers)
+
+    return asyncio.run(post())
+
+
+def test_update_is_handled(handled):
+    assert post_webhook(json.dumps(UPDATE).encode()).status_code == 200
+    # Повторная доставка того же обновления пропускается
+    assert post_webhook(json.dumps(UPDATE).encode()).status_code == 200
+    assert handled == [UPDATE['update_id']]
+
+
+@pytest.mark.parametrize('secret', [None, 'wrong-secret'])
+def test_wrong_secret_is_rejected(handled, secret):
+    assert post_webhook(json.dumps(UPDATE).encode(), secret=secret).status_code == 401
+    assert handled == []
+
+
+@pytest.mark.parametrize('body', [
+    b'{"update_id": 1001, "message": ',
+    b'[]',
+    json.dumps({'update_id': 1001, 'message': {'message_id': 1}}).encode(),
+])
+def test_malformed_update_is_dropped(handled, body):
+    # Ответ 2xx, чтобы Telegram не доставлял некорректное обновление повторно
+    assert post_webhook(body).status_code == 200
+    assert handled == []
+    assert not update_queue.is_duplicate(UPDATE['update_id'])
+
+
+def test_full_queue_is_retried_by_telegram(handled, monkeypatch):
+    async def put(update):
+        return False
+
+    monkeypatch.setattr(settings, 'WEBHOOK_QUEUE', True)
+    monkeypatch.setattr(update_queue, 'put', put)
+    assert post_webhook(json.dumps(UPDATE).encode()).status_code == 503
+    # Повторная доставка после 503 не считается дубликатом
+    assert not update_queue.is_duplicate(UPDATE['update_id'])